@@ -0,0 +1,100 @@
+package main
+
+import (
+	"container/list"
+	"context"
+	"sync"
+)
+
+// admission bounds how many analyses run at once. Unlike a buffered channel
+// used as a semaphore, its capacity can be changed at runtime and its counters
+// can be read safely for the health endpoint.
+type admission struct {
+	mu       sync.Mutex
+	capacity int
+	active   int
+	waiters  list.List // chan struct{} per blocked Acquire, in arrival order
+}
+
+func newAdmission(capacity int) *admission {
+	return &admission{capacity: capacity}
+}
+
+// TryAcquire takes a slot if one is free and nobody is queued ahead, without
+// blocking.
+func (a *admission) TryAcquire() bool {
+	a.mu.Lock()
+	defer a.mu.Unlock()
+	if a.active < a.capacity && a.waiters.Len() == 0 {
+		a.active++
+		return true
+	}
+	return false
+}
+
+// Acquire blocks until a slot is free or ctx ends. Waiters are served in
+// arrival order.
+func (a *admission) Acquire(ctx context.Context) error {
+	a.mu.Lock()
+	if a.active < a.capacity && a.waiters.Len() == 0 {
+		a.active++
+		a.mu.Unlock()
+		return nil
+	}
+	ready := make(chan struct{})
+	elem := a.waiters.PushBack(ready)
+	a.mu.Unlock()
+
+	select {
+	case <-ready:
+		return nil
+	case <-ctx.Done():
+		a.mu.Lock()
+		select {
+		case <-ready:
+			// the slot was granted while we were giving up; hand it back
+			a.mu.Unlock()
+			a.Release()
+		default:
+			a.waiters.Remove(elem)
+			a.mu.Unlock()
+		}
+		return ctx.Err()
+	}
+}
+
+// Release frees a slot taken by Acquire.
+func (a *admission) Release() {
+	a.mu.Lock()
+	a.active--
+	a.grantLocked()
+	a.mu.Unlock()
+}
+
+// SetCapacity changes the number of slots. Raising it admits waiters right
+// away; lowering it lets running analyses finish and admits no one new until
+// the active count drops below the new limit.
+func (a *admission) SetCapacity(capacity int) {
+	a.mu.Lock()
+	a.capacity = capacity
+	a.grantLocked()
+	a.mu.Unlock()
+}
+
+// Stats returns the current number of running analyses, the capacity and the
+// number of requests waiting for a slot.
+func (a *admission) Stats() (active, capacity, waiting int) {
+	a.mu.Lock()
+	defer a.mu.Unlock()
+	return a.active, a.capacity, a.waiters.Len()
+}
+
+// grantLocked hands free slots to waiters in FIFO order. a.mu must be held.
+func (a *admission) grantLocked() {
+	for a.active < a.capacity && a.waiters.Len() > 0 {
+		front := a.waiters.Front()
+		a.waiters.Remove(front)
+		a.active++
+		close(front.Value.(chan struct{}))
+	}
+}
@@ -0,0 +1,162 @@
+package main
+
+import (
+	"context"
+	"testing"
+	"time"
+)
+
+func checkAdmissionStats(t *testing.T, a *admission, active, capacity, waiting int) {
+	t.Helper()
+	gotActive, gotCapacity, gotWaiting := a.Stats()
+	if gotActive != active || gotCapacity != capacity || gotWaiting != waiting {
+		t.Fatalf("got %d active, capacity %d, %d waiting; want %d, %d, %d",
+			gotActive, gotCapacity, gotWaiting, active, capacity, waiting)
+	}
+}
+
+// queueWaiter starts an Acquire and returns once it is queued. id is sent on
+// granted when the slot is granted.
+func queueWaiter(t *testing.T, a *admission, id int, granted chan<- int) {
+	t.Helper()
+	_, _, waiting := a.Stats()
+	go func() {
+		if err := a.Acquire(context.Background()); err != nil {
+			t.Error(err)
+			return
+		}
+		granted <- id
+	}()
+	for deadline := time.Now().Add(5 * time.Second); ; time.Sleep(time.Millisecond) {
+		if _, _, w := a.Stats(); w > waiting {
+			return
+		}
+		if time.Now().After(deadline) {
+			t.Fatalf("waiter %d never queued", id)
+		}
+	}
+}
+
+func expectNoGrant(t *testing.T, granted <-chan int) {
+	t.Helper()
+	select {
+	case id := <-granted:
+		t.Fatalf("waiter %d was granted a slot", id)
+	case <-time.After(10 * time.Millisecond):
+	}
+}
+
+func TestAdmissionFIFO(t *testing.T) {
+	a := newAdmission(1)
+	if !a.TryAcquire() {
+		t.Fatal("TryAcquire failed on a free admission")
+	}
+	granted := make(chan int)
+	for id := 0; id < 5; id++ {
+		queueWaiter(t, a, id, granted)
+	}
+	checkAdmissionStats(t, a, 1, 1, 5)
+	if a.TryAcquire() {
+		t.Fatal("TryAcquire jumped the queue")
+	}
+	for want := 0; want < 5; want++ {
+		a.Release()
+		if id := <-granted; id != want {
+			t.Fatalf("waiter %d granted, want %d", id, want)
+		}
+	}
+	checkAdmissionStats(t, a, 1, 1, 0)
+	a.Release()
+	checkAdmissionStats(t, a, 0, 1, 0)
+}
+
+// TestAdmissionCancelAtGrant cancels waiters while their slot is being
+// granted. A waiter that gives up must hand a granted slot back. Run it with
+// -race.
+func TestAdmissionCancelAtGrant(t *testing.T) {
+	a := newAdmission(1)
+
+	// grant the slot while the cancelled waiter is blocked on the lock, so
+	// it finds the slot already granted when it gets there
+	for n := 0; n < 20; n++ {
+		a.TryAcquire()
+		ctx, cancel := context.WithCancel(context.Background())
+		done := make(chan error)
+		go func() { done <- a.Acquire(ctx) }()
+		for _, _, waiting := a.Stats(); waiting == 0; _, _, waiting = a.Stats() {
+			time.Sleep(time.Microsecond)
+		}
+		a.mu.Lock()
+		cancel()
+		time.Sleep(2 * time.Millisecond)
+		a.active--
+		a.grantLocked()
+		a.mu.Unlock()
+		if err := <-done; err == nil {
+			a.Release()
+		}
+		checkAdmissionStats(t, a, 0, 1, 0)
+	}
+
+	// and with cancel and Release racing each other
+	for n := 0; n < 1000; n++ {
+		if !a.TryAcquire() {
+			t.Fatal("slot leaked")
+		}
+		ctx, cancel := context.WithCancel(context.Background())
+		done := make(chan error)
+		go func() { done <- a.Acquire(ctx) }()
+		for _, _, waiting := a.Stats(); waiting == 0; _, _, waiting = a.Stats() {
+			time.Sleep(time.Microsecond)
+		}
+		go cancel()
+		a.Release()
+		if err := <-done; err == nil {
+			a.Release()
+		}
+		cancel()
+		checkAdmissionStats(t, a, 0, 1, 0)
+	}
+}
+
+func TestAdmissionRaiseCapacity(t *testing.T) {
+	a := newAdmission(1)
+	a.TryAcquire()
+	granted := make(chan int)
+	for id := 0; id < 3; id++ {
+		queueWaiter(t, a, id, granted)
+	}
+	a.SetCapacity(3)
+	// the first two waiters are admitted together, in either order
+	if first, second := <-granted, <-granted; first+second != 1 {
+		t.Fatalf("waiters %d and %d granted, want 0 and 1", first, second)
+	}
+	expectNoGrant(t, granted)
+	checkAdmissionStats(t, a, 3, 3, 1)
+	a.Release()
+	if id := <-granted; id != 2 {
+		t.Fatalf("waiter %d granted, want 2", id)
+	}
+	checkAdmissionStats(t, a, 3, 3, 0)
+}
+
+func TestAdmissionLowerCapacity(t *testing.T) {
+	a := newAdmission(3)
+	for i := 0; i < 3; i++ {
+		a.TryAcquire()
+	}
+	a.SetCapacity(1)
+	checkAdmissionStats(t, a, 3, 1, 0)
+	if a.TryAcquire() {
+		t.Fatal("TryAcquire went over the lowered capacity")
+	}
+	granted := make(chan int)
+	queueWaiter(t, a, 0, granted)
+	a.Release()
+	a.Release()
+	expectNoGrant(t, granted)
+	checkAdmissionStats(t, a, 1, 1, 1)
+	a.Release()
+	<-granted
+	checkAdmissionStats(t, a, 1, 1, 0)
+}
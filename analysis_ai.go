@@ -49,9 +49,20 @@ func init() {
 		log.Println("CRITICAL: GROQ_MODEL not found in environment variables. Defaulting to meta-llama/llama-4-scout-17b-16e-instruct.")
 		groqModel = "meta-llama/llama-4-scout-17b-16e-instruct"
 	}
+}
 
-	httpClient = &http.Client{
-		Timeout: 30 * time.Second,
+// newGroqHTTPClient builds the client used for Groq calls on its own
+// transport, keeping one idle connection per AI worker so concurrent calls
+// reuse TLS connections instead of redialing. The default transport keeps
+// only two idle connections per host.
+func newGroqHTTPClient(maxConcurrentCalls int) *http.Client {
+	transport := http.DefaultTransport.(*http.Transport).Clone()
+	transport.MaxIdleConns = maxConcurrentCalls
+	transport.MaxIdleConnsPerHost = maxConcurrentCalls
+	transport.MaxConnsPerHost = maxConcurrentCalls
+	return &http.Client{
+		Timeout:   30 * time.Second,
+		Transport: transport,
 	}
 }
 
@@ -269,15 +280,14 @@ func invokeGroq(ctx context.Context, systemPrompt, userContent string) (string,
 	return "", fmt.Errorf("all Groq attempts failed for %s (unknown error)", keyName)
 }
 
-func AnalyzeMessagesWithLLM(ctx context.Context, data []ParsedMessage, gapHours float64) (string, error) {
+// AnalyzeMessagesWithLLM sends the stratified per-user message sample to the
+// LLM. userCount is the number of distinct senders in the whole chat.
+func AnalyzeMessagesWithLLM(ctx context.Context, stratifiedData map[string][]string, userCount int) (string, error) {
 	if groqAPIKey == "" {
 		log.Println("Skipping AI Analysis: GROQ_API_KEY not configured.")
 		return "", nil
 	}
 
-	topics := groupMessagesByTopic(data, gapHours)
-	stratifiedData := stratifyMessages(topics)
-
 	if len(stratifiedData) == 0 {
 		log.Println("No messages eligible for AI analysis after grouping and stratifying.")
 		return "", nil
@@ -290,12 +300,6 @@ func AnalyzeMessagesWithLLM(ctx context.Context, data []ParsedMessage, gapHours
 	}
 	groupedMessagesJSON := string(groupedMessagesJSONBytes)
 
-	uniqueUsers := make(map[string]struct{})
-	for _, msg := range data {
-		uniqueUsers[msg.Sender] = struct{}{}
-	}
-	userCount := len(uniqueUsers)
-
 	systemPrompt := `
         You will be given a list of messages from each user in a chat.
         The messages are stratified and cherry picked to be the most interesting, funny, or dramatic.
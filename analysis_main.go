@@ -5,15 +5,10 @@ import (
 	"encoding/json"
 	"errors"
 	"fmt"
-	"io"
 	"log"
 	"runtime"
-	"sort"
 	"strings"
-	"sync"
 	"time"
-
-	"golang.org/x/exp/maps"
 )
 
 type aiResultTuple struct {
@@ -21,12 +16,45 @@ type aiResultTuple struct {
 	err    error
 }
 
+type statsOutcome struct {
+	stats *ChatStatistics
+	err   error
+}
+
 type aiTask struct {
-	ctx          context.Context
-	messagesData []ParsedMessage
-	gapHours     float64
-	resultChan   chan aiResultTuple
-	logPrefix    string
+	ctx            context.Context
+	stratifiedData map[string][]string
+	userCount      int
+	resultChan     chan aiResultTuple
+	logPrefix      string
+}
+
+// heavyStatsThreshold is the message count above which statistics are treated
+// as heavy CPU work and must wait for a free CPU slot before running.
+const heavyStatsThreshold = 5000
+
+// heavyPreprocessBytes is the upload size above which preprocessing counts as
+// heavy CPU work, roughly heavyStatsThreshold lines of a typical export.
+const heavyPreprocessBytes = heavyStatsThreshold * 80
+
+// cpuSlots bounds how many heavy parsing and statistics computations run at
+// once so large chats from concurrent requests don't oversubscribe the
+// available cores.
+var cpuSlots = make(chan struct{}, runtime.NumCPU())
+
+// runCPU runs fn directly for light work. Heavy work first acquires a CPU slot,
+// giving up if ctx ends while waiting.
+func runCPU(ctx context.Context, heavy bool, fn func()) error {
+	if heavy {
+		select {
+		case cpuSlots <- struct{}{}:
+			defer func() { <-cpuSlots }()
+		case <-ctx.Done():
+			return ctx.Err()
+		}
+	}
+	fn()
+	return nil
 }
 
 type AnalysisResult struct {
@@ -37,9 +65,13 @@ type AnalysisResult struct {
 	Error         string          `json:"error,omitempty"`
 }
 
-func AnalyzeChat(ctx context.Context, chatReader io.Reader, originalFilename string, aiQueue chan<- aiTask, aiQueueTimeout time.Duration) (*AnalysisResult, error) {
+// AnalyzeChat parses chatData and computes its statistics and, for small
+// group chats, the AI analysis. If onStats is non-nil it is called with a
+// partial result as soon as the statistics are ready, before the AI analysis
+// is awaited.
+func AnalyzeChat(ctx context.Context, chatData []byte, originalFilename string, aiQueue chan<- aiTask, aiQueueTimeout time.Duration, onStats func(*AnalysisResult)) (*AnalysisResult, error) {
 	logPrefix := fmt.Sprintf("[%s]", originalFilename)
-	// log.Printf("%s Starting analysis using reader", logPrefix)
+	// log.Printf("%s Starting analysis of %d bytes", logPrefix, len(chatData))
 	// Added to store raw message count
 	var messagesData []ParsedMessage
 	var statsResult *ChatStatistics
@@ -49,7 +81,15 @@ func AnalyzeChat(ctx context.Context, chatReader io.Reader, originalFilename str
 	var userCount int
 	var uniqueUsers []string
 
-	rawMessageCount, messagesData, preprocessErr = preprocessMessages(chatReader) // Modified to get rawMessageCount
+	// parsing a large export is as CPU-bound as the statistics, so it waits
+	// for a CPU slot too rather than running on every request goroutine at once
+	cpuErr := runCPU(ctx, len(chatData) > heavyPreprocessBytes, func() {
+		rawMessageCount, messagesData, preprocessErr = preprocessMessages(chatData) // Modified to get rawMessageCount
+	})
+	if cpuErr != nil {
+		log.Printf("%s Gave up waiting for a CPU slot to preprocess: %v", logPrefix, cpuErr)
+		return nil, fmt.Errorf("preprocessing cancelled: %w", cpuErr)
+	}
 	if preprocessErr != nil {
 		log.Printf("%s Preprocessing failed: %v", logPrefix, preprocessErr)
 		return nil, fmt.Errorf("preprocessing failed: %w", preprocessErr)
@@ -64,39 +104,56 @@ func AnalyzeChat(ctx context.Context, chatReader io.Reader, originalFilename str
 		}, nil
 	}
 
-	usersSet := make(map[string]struct{})
-	for _, msg := range messagesData {
-		usersSet[msg.Sender] = struct{}{}
+	cols := newMessageColumns(messagesData)
+	// statistics and topic grouping both work on the messages in timestamp
+	// order. Put them in order once, before anything reads them, so the
+	// results don't depend on whether the AI path runs and grouping only
+	// reads the slice while statistics run alongside it.
+	if !cols.chronological() {
+		messagesData, cols = cols.sortByTime(messagesData)
 	}
-	uniqueUsers = maps.Keys(usersSet)
-	sort.Strings(uniqueUsers)
+	uniqueUsers = cols.users
 	userCount = len(uniqueUsers)
 	chatName := deriveChatName(originalFilename, uniqueUsers)
-	dynamicConvoBreakMinutes := calculateDynamicConvoBreak(messagesData, 120, 30, 300)
+	dynamicConvoBreakMinutes := calculateDynamicConvoBreak(cols, 120, 30, 300)
+
+	shouldRunAI := userCount > 1 && userCount <= maxUsersForPeopleBlock
 
-	var wg sync.WaitGroup
 	var aiResultChan chan aiResultTuple
+	// the AI task gets its own cancel so it can be dropped if statistics fail
+	aiCtx, aiCancel := context.WithCancel(ctx)
+	defer aiCancel()
 
-	wg.Add(1)
-	go func(data []ParsedMessage, breakMinutes int) {
-		defer wg.Done()
-		statsResult, statsErr = calculateChatStatistics(data, breakMinutes)
-		if statsErr != nil {
-			log.Printf("%s Statistics goroutine finished with error: %v", logPrefix, statsErr)
+	statsDone := make(chan statsOutcome, 1)
+	heavy := len(messagesData) > heavyStatsThreshold
+	go func(data []ParsedMessage, cols messageColumns, breakMinutes int) {
+		var outcome statsOutcome
+		cpuErr := runCPU(ctx, heavy, func() {
+			outcome.stats, outcome.err = calculateChatStatistics(data, cols, breakMinutes)
+		})
+		if cpuErr != nil {
+			outcome.err = cpuErr
+		}
+		if outcome.err != nil {
+			log.Printf("%s Statistics goroutine finished with error: %v", logPrefix, outcome.err)
 		}
-		data = nil
-	}(messagesData, dynamicConvoBreakMinutes)
+		statsDone <- outcome
+	}(messagesData, cols, dynamicConvoBreakMinutes)
 
-	shouldRunAI := userCount > 1 && userCount <= maxUsersForPeopleBlock
 	if shouldRunAI {
+		// build the AI payload while statistics run, so the queued task only
+		// holds the small stratified sample, not the full message list
+		topics := groupMessagesByTopic(messagesData, cols.timestamps, float64(dynamicConvoBreakMinutes)/60.0)
+		stratifiedData := stratifyMessages(topics)
+
 		// log.Printf("%s Preparing AI analysis task.", logPrefix)
 		aiResultChan = make(chan aiResultTuple, 1)
 		task := aiTask{
-			ctx:          ctx,
-			messagesData: messagesData,
-			gapHours:     float64(dynamicConvoBreakMinutes) / 60.0,
-			resultChan:   aiResultChan,
-			logPrefix:    logPrefix,
+			ctx:            aiCtx,
+			stratifiedData: stratifiedData,
+			userCount:      userCount,
+			resultChan:     aiResultChan,
+			logPrefix:      logPrefix,
 		}
 
 		sendTimer := time.NewTimer(aiQueueTimeout)
@@ -125,10 +182,21 @@ func AnalyzeChat(ctx context.Context, chatReader io.Reader, originalFilename str
 		log.Printf("%s Skipping AI analysis: User count (%d) is not between 2 and %d.", logPrefix, userCount, maxUsersForPeopleBlock)
 	}
 
-	messagesData = nil
-	runtime.GC()
-
-	wg.Wait()
+	statsOut := <-statsDone
+	statsResult, statsErr = statsOut.stats, statsOut.err
+	if statsErr != nil && aiResultChan != nil && aiErr == nil {
+		log.Printf("%s Statistics failed, cancelling queued AI analysis.", logPrefix)
+		aiCancel()
+		aiResultChan = nil
+	}
+	if statsErr == nil && statsResult != nil && onStats != nil {
+		statsResult.TotalMessages = rawMessageCount
+		onStats(&AnalysisResult{
+			ChatName:      chatName,
+			TotalMessages: rawMessageCount,
+			Stats:         statsResult,
+		})
+	}
 
 	var aiFinalResult string
 	if aiResultChan != nil && aiErr == nil {
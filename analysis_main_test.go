@@ -0,0 +1,93 @@
+package main
+
+import (
+	"context"
+	"fmt"
+	"math/rand"
+	"reflect"
+	"strings"
+	"testing"
+	"time"
+)
+
+// TestAnalyzeChatWithAI runs a chat small enough in users for the AI path,
+// where topic grouping reads the messages while statistics run alongside it.
+// Run it with -race.
+func TestAnalyzeChatWithAI(t *testing.T) {
+	r := rand.New(rand.NewSource(1))
+	users := []string{"Alice Smith", "Bob", "Carol: Work", "+1 555 0100"}
+	words := []string{"hello", "pizza", "tomorrow", "meeting", "guitar", "really", "weekend", "😂", "ok"}
+	var chat strings.Builder
+	at := time.Date(2023, 1, 1, 9, 0, 0, 0, time.UTC)
+	const messages = 6000
+	for n := 0; n < messages; n++ {
+		at = at.Add(time.Duration(r.Intn(180)) * time.Minute)
+		ts := at
+		if r.Intn(50) == 0 {
+			ts = ts.Add(-time.Duration(r.Intn(600)) * time.Minute) // out of order
+		}
+		text := make([]string, 3+r.Intn(10))
+		for i := range text {
+			text[i] = words[r.Intn(len(words))]
+		}
+		fmt.Fprintf(&chat, "%s - %s: %s\n", ts.Format("1/2/06, 3:04 PM"), users[r.Intn(len(users))], strings.Join(text, " "))
+	}
+
+	aiQueue := make(chan aiTask)
+	go func() {
+		task := <-aiQueue
+		if task.userCount != len(users) || len(task.stratifiedData) == 0 {
+			task.resultChan <- aiResultTuple{err: fmt.Errorf("got %d users, %d senders sampled", task.userCount, len(task.stratifiedData))}
+			return
+		}
+		task.resultChan <- aiResultTuple{result: `{"summary":"ok"}`}
+	}()
+
+	var streamed *AnalysisResult
+	result, err := AnalyzeChat(context.Background(), []byte(chat.String()), "chat.txt", aiQueue, time.Second, func(r *AnalysisResult) {
+		streamed = r
+	})
+	if err != nil {
+		t.Fatal(err)
+	}
+	if result.Error != "" {
+		t.Fatal(result.Error)
+	}
+	if result.TotalMessages != messages || result.Stats == nil || result.Stats.TotalMessages != messages {
+		t.Errorf("got %d messages, want %d", result.TotalMessages, messages)
+	}
+	if string(result.AIAnalysis) != `{"summary":"ok"}` {
+		t.Errorf("got AI analysis %s", result.AIAnalysis)
+	}
+	if streamed == nil || streamed.Stats != result.Stats {
+		t.Error("statistics were not streamed before the AI result")
+	}
+}
+
+// TestAnalyzeChatOrdersMessages checks that a chat with too many users for
+// the AI path still gets its statistics from the messages in timestamp
+// order.
+func TestAnalyzeChatOrdersMessages(t *testing.T) {
+	r := rand.New(rand.NewSource(2))
+	lines := make([]string, 3000)
+	at := time.Date(2023, 1, 1, 9, 0, 0, 0, time.UTC)
+	for i := range lines {
+		at = at.Add(time.Duration(1+r.Intn(120)) * time.Minute)
+		lines[i] = fmt.Sprintf("%s - User %d: message %d", at.Format("2/1/06, 15:04"), r.Intn(20), r.Intn(100))
+	}
+	ordered, err := AnalyzeChat(context.Background(), []byte(strings.Join(lines, "\n")), "chat.txt", nil, time.Second, nil)
+	if err != nil {
+		t.Fatal(err)
+	}
+	for n := 0; n < 100; n++ {
+		i, j := r.Intn(len(lines)), r.Intn(len(lines))
+		lines[i], lines[j] = lines[j], lines[i]
+	}
+	shuffled, err := AnalyzeChat(context.Background(), []byte(strings.Join(lines, "\n")), "chat.txt", nil, time.Second, nil)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if ordered.Stats == nil || !reflect.DeepEqual(ordered.Stats, shuffled.Stats) {
+		t.Errorf("statistics depend on the order of the lines:\n%+v\n%+v", ordered.Stats, shuffled.Stats)
+	}
+}
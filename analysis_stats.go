@@ -4,11 +4,10 @@ import (
 	"fmt"
 	"log"
 	"math"
-	"regexp"
 	"sort"
-	"strings"
+	"sync"
 	"time"
-	"unicode"
+	"unicode/utf8"
 
 	"golang.org/x/exp/maps"
 )
@@ -19,9 +18,20 @@ type PercentageMap map[string]float64
 
 type StringIntMap map[string]int
 
-type UserStringIntMap map[string]map[string]int
+// InteractionMatrix counts replies between users, indexed by position in the
+// sorted user list: [from][to].
+type InteractionMatrix [][]int
 
-type InteractionMatrix map[string]map[string]int
+// newInteractionMatrix allocates an n x n matrix whose rows share a single
+// contiguous backing array.
+func newInteractionMatrix(n int) InteractionMatrix {
+	counts := make([]int, n*n)
+	matrix := make(InteractionMatrix, n)
+	for i := range matrix {
+		matrix[i] = counts[i*n : (i+1)*n : (i+1)*n]
+	}
+	return matrix
+}
 
 type GraphPoint struct {
 	X string `json:"x"`
@@ -63,53 +73,164 @@ type ChatStatistics struct {
 	UserInteractionMatrix      [][]interface{}         `json:"user_interaction_matrix,omitempty"`
 }
 
-func calculatePercentile(sortedData []float64, p float64) float64 {
-	n := len(sortedData)
+// selectKth partially reorders data so that data[k] holds the value it would
+// have if data were sorted, and returns it. Expected linear time.
+func selectKth(data []float64, k int) float64 {
+	lo, hi := 0, len(data)-1
+	for lo < hi {
+		// median-of-three pivot keeps already sorted input linear
+		mid := lo + (hi-lo)/2
+		if data[mid] < data[lo] {
+			data[lo], data[mid] = data[mid], data[lo]
+		}
+		if data[hi] < data[lo] {
+			data[lo], data[hi] = data[hi], data[lo]
+		}
+		if data[hi] < data[mid] {
+			data[mid], data[hi] = data[hi], data[mid]
+		}
+		pivot := data[mid]
+
+		i, j := lo, hi
+		for i <= j {
+			for data[i] < pivot {
+				i++
+			}
+			for data[j] > pivot {
+				j--
+			}
+			if i <= j {
+				data[i], data[j] = data[j], data[i]
+				i++
+				j--
+			}
+		}
+
+		switch {
+		case k <= j:
+			hi = j
+		case k >= i:
+			lo = i
+		default:
+			return data[k]
+		}
+	}
+	return data[k]
+}
+
+// calculatePercentile returns the p-th percentile of data using quickselect
+// instead of a full sort. data is reordered in place.
+func calculatePercentile(data []float64, p float64) float64 {
+	n := len(data)
 	if n == 0 {
 		return 0 // Or handle as error
 	}
 	if p <= 0 {
-		return sortedData[0]
+		return selectKth(data, 0)
 	}
 	if p >= 100 {
-		return sortedData[n-1]
+		return selectKth(data, n-1)
 	}
 
 	rank := (p / 100.0) * float64(n+1)
 
 	k := int(rank)
-	d := rank - float64(k)
 
 	if k == 0 {
-		return sortedData[0]
+		return selectKth(data, 0)
 	}
 	if k >= n {
-		return sortedData[n-1]
+		return selectKth(data, n-1)
+	}
+
+	// rank interpolates between the (k-1)-th and k-th order statistics, but
+	// the fractional weight has always been applied to a zero difference, so
+	// the result is the (k-1)-th value
+	return selectKth(data, k-1)
+}
+
+// messageColumns holds the per-message fields the statistics passes read, as
+// flat columns built once and shared between them instead of each pass
+// walking the ParsedMessage structs and hashing sender strings again.
+type messageColumns struct {
+	users       []string // unique senders, sorted
+	senderCodes []int    // per message, index into users
+	timestamps  []int64  // per message, Unix seconds
+}
+
+func newMessageColumns(messagesData []ParsedMessage) messageColumns {
+	usersSet := make(map[string]struct{})
+	for _, msg := range messagesData {
+		usersSet[msg.Sender] = struct{}{}
+	}
+	users := maps.Keys(usersSet)
+	sort.Strings(users)
+	userIndex := make(map[string]int, len(users))
+	for i, user := range users {
+		userIndex[user] = i
 	}
 
-	valKMinus1 := sortedData[k-1]
-	valK := sortedData[k]
+	cols := messageColumns{
+		users:       users,
+		senderCodes: make([]int, len(messagesData)),
+		timestamps:  make([]int64, len(messagesData)),
+	}
+	for i, msg := range messagesData {
+		cols.senderCodes[i] = userIndex[msg.Sender]
+		cols.timestamps[i] = msg.Timestamp.Unix()
+	}
+	return cols
+}
+
+// chronological reports whether the messages are already in timestamp order.
+func (cols messageColumns) chronological() bool {
+	for i := 1; i < len(cols.timestamps); i++ {
+		if cols.timestamps[i] < cols.timestamps[i-1] {
+			return false
+		}
+	}
+	return true
+}
+
+// sortByTime returns the messages and their columns in timestamp order,
+// keeping messages with equal timestamps in their original order. Only an
+// index permutation is sorted, by the Unix-second column, and each message
+// is then moved once.
+func (cols messageColumns) sortByTime(messagesData []ParsedMessage) ([]ParsedMessage, messageColumns) {
+	order := make([]int, len(messagesData))
+	for i := range order {
+		order[i] = i
+	}
+	sort.SliceStable(order, func(i, j int) bool {
+		return cols.timestamps[order[i]] < cols.timestamps[order[j]]
+	})
 
-	return valKMinus1 + d*(valK-valK)
+	sortedMessages := make([]ParsedMessage, len(messagesData))
+	sorted := messageColumns{
+		users:       cols.users,
+		senderCodes: make([]int, len(order)),
+		timestamps:  make([]int64, len(order)),
+	}
+	for i, k := range order {
+		sortedMessages[i] = messagesData[k]
+		sorted.senderCodes[i] = cols.senderCodes[k]
+		sorted.timestamps[i] = cols.timestamps[k]
+	}
+	return sortedMessages, sorted
 }
 
-func calculateDynamicConvoBreak(messagesData []ParsedMessage, defaultBreakMinutes, minBreak, maxBreak int) int {
+func calculateDynamicConvoBreak(cols messageColumns, defaultBreakMinutes, minBreak, maxBreak int) int {
 	responseTimesMinutes := []float64{}
-	var lastTimestamp time.Time
-	var lastSender string
-	firstTimestampProcessed := false
 
-	for _, msg := range messagesData {
-		if firstTimestampProcessed && lastSender != "" && msg.Sender != lastSender {
-			timeDiffSeconds := msg.Timestamp.Sub(lastTimestamp).Seconds()
+	for i := 1; i < len(cols.senderCodes); i++ {
+		lastCode := cols.senderCodes[i-1]
+		if cols.users[lastCode] != "" && cols.senderCodes[i] != lastCode {
+			timeDiffSeconds := float64(cols.timestamps[i] - cols.timestamps[i-1])
 
 			if timeDiffSeconds > 5 && timeDiffSeconds < (12*3600) {
 				responseTimesMinutes = append(responseTimesMinutes, timeDiffSeconds/60.0)
 			}
 		}
-		lastTimestamp = msg.Timestamp
-		lastSender = msg.Sender
-		firstTimestampProcessed = true
 	}
 
 	if len(responseTimesMinutes) < 20 {
@@ -117,8 +238,6 @@ func calculateDynamicConvoBreak(messagesData []ParsedMessage, defaultBreakMinute
 		return defaultBreakMinutes
 	}
 
-	sort.Float64s(responseTimesMinutes)
-
 	p85 := calculatePercentile(responseTimesMinutes, 85.0)
 
 	dynamicBreak := p85 + 30
@@ -130,226 +249,376 @@ func calculateDynamicConvoBreak(messagesData []ParsedMessage, defaultBreakMinute
 	return result
 }
 
+// countTopN returns the n entries of counter with the highest counts. It
+// keeps a size-n min-heap of the best entries seen so far instead of sorting
+// every unique key, so the cost is O(U log n) rather than O(U log U).
 func countTopN(counter map[string]int, n int) StringIntMap {
 	type kv struct {
 		Key   string
 		Value int
 	}
-	var ss []kv
+	top := make([]kv, 0, max(0, min(n, len(counter))))
 	for k, v := range counter {
-		ss = append(ss, kv{k, v})
+		if len(top) < n {
+			top = append(top, kv{k, v})
+			for i := len(top) - 1; i > 0; {
+				parent := (i - 1) / 2
+				if top[parent].Value <= top[i].Value {
+					break
+				}
+				top[parent], top[i] = top[i], top[parent]
+				i = parent
+			}
+			continue
+		}
+		if n == 0 || v <= top[0].Value {
+			continue
+		}
+		// replace the smallest kept entry and sift it down
+		top[0] = kv{k, v}
+		for i := 0; ; {
+			smallest := i
+			if left := 2*i + 1; left < len(top) && top[left].Value < top[smallest].Value {
+				smallest = left
+			}
+			if right := 2*i + 2; right < len(top) && top[right].Value < top[smallest].Value {
+				smallest = right
+			}
+			if smallest == i {
+				break
+			}
+			top[i], top[smallest] = top[smallest], top[i]
+			i = smallest
+		}
 	}
 
-	sort.Slice(ss, func(i, j int) bool {
-		return ss[i].Value > ss[j].Value
-	})
-
-	topN := make(StringIntMap)
-	count := 0
-	for _, pair := range ss {
-		if count >= n {
-			break
-		}
+	topN := make(StringIntMap, len(top))
+	for _, pair := range top {
 		topN[pair.Key] = pair.Value
-		count++
 	}
 	return topN
 }
 
-// main stats calculation function
-
-func calculateChatStatistics(messagesData []ParsedMessage, convoBreakMinutes int) (*ChatStatistics, error) {
-	// log.Printf("Starting statistics calculation for %d messages...", len(messagesData))
-	if len(messagesData) == 0 {
-		return nil, fmt.Errorf("cannot calculate statistics on empty message list")
-	}
-
-	userMessageCount := make(UserMessageCount)
-	userStartsConvo := make(map[string]int)
-	userFirstTexts := make(map[string]int) // Count per day
-	wordCounter := make(map[string]int)
-	emojiCounter := make(map[string]int) // Counts distinct emojis per message
-
-	dailyMessageCountByDate := make(map[string]int) // YYYY-MM-DD -> count
-	hourlyMessageCount := make(map[int]int)         // 0-23 -> count
-	dailyMessageCountByWeekday := make(map[int]int) // 0 (Sun) - 6 (Sat) -> count
-	monthlyActivityByUser := make(UserStringIntMap) // user -> month (YYYY-MM) -> count
-
-	totalResponseTimeSeconds := 0.0
-	responseCount := 0
-	interactionMatrix := make(InteractionMatrix)
+// isWordByte reports whether c is an ASCII word character, matching the
+// regexp definition of \w used for word boundaries.
+func isWordByte(c byte) bool {
+	return c == '_' || ('0' <= c && c <= '9') || ('a' <= c && c <= 'z') || ('A' <= c && c <= 'Z')
+}
 
-	maxMonologueCount := 0
-	maxMonologueSender := ""
-	currentStreakCount := 0
-	currentStreakSender := ""
+// Initial capacities for the token counters, so growing them does not rehash
+// repeatedly in the common case. Small chats are sized by their message count.
+const (
+	maxWordCounterHint = 4096
+	emojiCounterHint   = 64
+)
 
-	var lastTimestamp time.Time
-	var lastSender string
-	var lastDateStr string
-	currentConvoStartSender := ""
-	allMonths := make(map[string]struct{})
-	userIgnoredCount := make(map[string]int)
+// countWords adds the words of at least three ASCII letters or digits in a
+// cleaned message to counter, skipping stopwords. It scans by hand with the
+// same result as matching \b[a-zA-Z0-9]{3,}\b: a maximal run of word
+// characters counts only if it is long enough and has no underscore.
+// CleanedMessage is lowercased during preprocessing.
+func countWords(text string, counter map[string]int) {
+	for i := 0; i < len(text); {
+		if !isWordByte(text[i]) {
+			i++
+			continue
+		}
+		start := i
+		hasUnderscore := false
+		for i < len(text) && isWordByte(text[i]) {
+			if text[i] == '_' {
+				hasUnderscore = true
+			}
+			i++
+		}
+		if i-start < 3 || hasUnderscore {
+			continue
+		}
+		word := text[start:i]
+		if _, isStopword := stopwordsSet[word]; !isStopword {
+			counter[word]++
+		}
+	}
+}
 
-	firstMessageTimestamp := messagesData[0].Timestamp
-	latestMessageTimestamp := messagesData[len(messagesData)-1].Timestamp
+// countEmojis adds every emoji in text to counter, keeping a following
+// variation selector or skin tone attached to its emoji.
+func countEmojis(text string, counter map[string]int) {
+	for i := 0; i < len(text); {
+		// every emoji rune is at least U+2600, so its UTF-8 encoding starts
+		// with a byte of at least 0xE2; lower bytes are skipped undecoded
+		if text[i] < 0xE2 {
+			i++
+			continue
+		}
+		r, size := utf8.DecodeRuneInString(text[i:])
+		if !isEmojiRune(r) {
+			i += size
+			continue
+		}
+		end := i + size
+		if next, nextSize := utf8.DecodeRuneInString(text[end:]); end < len(text) && isEmojiModifier(next) {
+			end += nextSize
+		}
+		counter[text[i:end]]++
+		i = end
+	}
+}
 
-	wordRegex := regexp.MustCompile(`\b[a-zA-Z0-9]{3,}\b`)
+// tokenCounts holds the word and emoji tallies for a run of messages.
+type tokenCounts struct {
+	words  map[string]int
+	emojis map[string]int
+}
 
-	convoBreakDuration := time.Duration(convoBreakMinutes) * time.Minute
+// countTokens tallies words and emojis in a single pass over the messages.
+func countTokens(messagesData []ParsedMessage) tokenCounts {
+	counts := tokenCounts{
+		words:  make(map[string]int, min(len(messagesData), maxWordCounterHint)),
+		emojis: make(map[string]int, emojiCounterHint),
+	}
+	for _, msg := range messagesData {
+		countWords(msg.CleanedMessage, counts.words)
+		countEmojis(msg.OriginalMessage, counts.emojis)
+	}
+	return counts
+}
 
-	for i, msg := range messagesData {
-		isNewConvo := false
-		isFirstMessage := (i == 0)
-
-		if !isFirstMessage {
-			timeDiff := msg.Timestamp.Sub(lastTimestamp)
-			if timeDiff > convoBreakDuration {
-				isNewConvo = true
-				currentConvoStartSender = msg.Sender // This message starts a new convo
-			} else if lastSender != "" && msg.Sender != lastSender {
-				responseDiffSeconds := timeDiff.Seconds()
-				if responseDiffSeconds > 5 && responseDiffSeconds < (12*3600) {
-					totalResponseTimeSeconds += responseDiffSeconds
-					responseCount++
-				}
-				if _, ok := interactionMatrix[lastSender]; !ok {
-					interactionMatrix[lastSender] = make(map[string]int)
-				}
-				interactionMatrix[lastSender][msg.Sender]++
+// countTokensAsync starts tokenizing the messages in chunks on goroutines
+// that each hold a spare CPU slot, so word and emoji counting overlaps the
+// sequential statistics. Each chunk covers at least heavyStatsThreshold
+// messages. When the chat is too small or no slot is free, the returned wait
+// func tokenizes everything on the caller's goroutine instead.
+func countTokensAsync(messagesData []ParsedMessage) (wait func() tokenCounts) {
+	maxWorkers := len(messagesData) / heavyStatsThreshold
+	workers := 0
+acquire:
+	for workers < maxWorkers {
+		select {
+		case cpuSlots <- struct{}{}:
+			workers++
+		default:
+			break acquire
+		}
+	}
+	if workers == 0 {
+		return func() tokenCounts { return countTokens(messagesData) }
+	}
+
+	results := make([]tokenCounts, workers)
+	chunkSize := (len(messagesData) + workers - 1) / workers
+	var wg sync.WaitGroup
+	for w := 0; w < workers; w++ {
+		start := w * chunkSize
+		end := min(start+chunkSize, len(messagesData))
+		wg.Add(1)
+		go func(w int, chunk []ParsedMessage) {
+			defer wg.Done()
+			defer func() { <-cpuSlots }()
+			results[w] = countTokens(chunk)
+		}(w, messagesData[start:end])
+	}
+
+	return func() tokenCounts {
+		wg.Wait()
+		merged := results[0]
+		for _, counts := range results[1:] {
+			for word, count := range counts.words {
+				merged.words[word] += count
+			}
+			for emoji, count := range counts.emojis {
+				merged.emojis[emoji] += count
 			}
-		} else {
-			isNewConvo = true
-			currentConvoStartSender = msg.Sender
 		}
+		return merged
+	}
+}
 
-		if isNewConvo && currentConvoStartSender != "" {
-			userStartsConvo[currentConvoStartSender]++
-			currentConvoStartSender = ""
-		}
+// conversationTally holds the order-dependent statistics produced by
+// conversationKernel. Per-user slices are indexed by sender code.
+type conversationTally struct {
+	startsConvo          []int
+	ignored              []int
+	interactions         InteractionMatrix
+	totalStarts          int
+	totalIgnored         int
+	totalResponseSeconds int64
+	responseCount        int
+	maxMonologueCount    int
+	maxMonologueCode     int
+}
 
-		userMessageCount[msg.Sender]++
+// conversationKernel walks the messages in order and tracks conversation
+// starts, replies, monologue streaks and ignored messages. It only touches
+// Unix-second timestamps and sender codes, keeping the sequential state
+// machine on flat arrays.
+func conversationKernel(timestamps []int64, codes []int, convoBreakSeconds int64, numUsers int) conversationTally {
+	tally := conversationTally{
+		startsConvo:      make([]int, numUsers),
+		ignored:          make([]int, numUsers),
+		interactions:     newInteractionMatrix(numUsers),
+		maxMonologueCode: -1,
+	}
 
-		// first text per day
-		currentDateStr := msg.Timestamp.Format("2006-01-02")
-		if currentDateStr != lastDateStr {
-			userFirstTexts[msg.Sender]++
-			lastDateStr = currentDateStr
+	currentStreakCount := 0
+	currentStreakCode := -1
+
+	for i, code := range codes {
+		if i == 0 || timestamps[i]-timestamps[i-1] > convoBreakSeconds {
+			// this message starts a new conversation
+			tally.startsConvo[code]++
+			tally.totalStarts++
+		} else if lastCode := codes[i-1]; code != lastCode {
+			responseDiffSeconds := timestamps[i] - timestamps[i-1]
+			if responseDiffSeconds > 5 && responseDiffSeconds < (12*3600) {
+				tally.totalResponseSeconds += responseDiffSeconds
+				tally.responseCount++
+			}
+			tally.interactions[lastCode][code]++
 		}
 
-		// monologue
-		if msg.Sender == currentStreakSender {
+		// monologue; a sender continuing their own streak also means their
+		// previous message went unanswered
+		if code == currentStreakCode {
 			currentStreakCount++
+			tally.ignored[code]++
+			tally.totalIgnored++
 		} else {
 			// End of previous streak
-			if currentStreakSender != "" && currentStreakCount > maxMonologueCount {
-				maxMonologueCount = currentStreakCount
-				maxMonologueSender = currentStreakSender
+			if currentStreakCode >= 0 && currentStreakCount > tally.maxMonologueCount {
+				tally.maxMonologueCount = currentStreakCount
+				tally.maxMonologueCode = currentStreakCode
 			}
-			currentStreakSender = msg.Sender
+			currentStreakCode = code
 			currentStreakCount = 1
 		}
+	}
 
-		words := wordRegex.FindAllString(strings.ToLower(msg.CleanedMessage), -1)
-		for _, word := range words {
-			if _, isStopword := stopwordsSet[word]; !isStopword {
-				wordCounter[word]++
-			}
-		}
+	if currentStreakCode >= 0 && currentStreakCount > tally.maxMonologueCount {
+		tally.maxMonologueCount = currentStreakCount
+		tally.maxMonologueCode = currentStreakCode
+	}
+	return tally
+}
 
-		foundEmojis := emojiPattern.FindAllString(msg.OriginalMessage, -1)
-		for _, emojiMatch := range foundEmojis {
-			runes := []rune(emojiMatch)
-			for i := 0; i < len(runes); i++ {
-				currentEmoji := string(runes[i])
-
-				if i+1 < len(runes) {
-					nextRune := runes[i+1]
-					if unicode.Is(unicode.Mn, nextRune) || unicode.Is(unicode.Sk, nextRune) ||
-						(nextRune >= 0x1F3FB && nextRune <= 0x1F3FF) {
-						currentEmoji += string(nextRune)
-						i++
-					}
-				}
+// main stats calculation function
 
-				emojiCounter[currentEmoji]++
-			}
-		}
+func calculateChatStatistics(messagesData []ParsedMessage, cols messageColumns, convoBreakMinutes int) (*ChatStatistics, error) {
+	// log.Printf("Starting statistics calculation for %d messages...", len(messagesData))
+	if len(messagesData) == 0 {
+		return nil, fmt.Errorf("cannot calculate statistics on empty message list")
+	}
 
-		dailyMessageCountByDate[currentDateStr]++
-		hourlyMessageCount[msg.Timestamp.Hour()]++
-		dailyMessageCountByWeekday[int(msg.Timestamp.Weekday())]++
+	var hourlyMessageCount [24]int        // 0-23 -> count
+	var dailyMessageCountByWeekday [7]int // 0 (Sun) - 6 (Sat) -> count
+
+	// senders are indexes into the sorted user list, so per-user counters
+	// are slices indexed by int instead of maps hashing sender strings on
+	// every message
+	sortedUsers, senderCodes, timestamps := cols.users, cols.senderCodes, cols.timestamps
 
-		monthStr := msg.Timestamp.Format("2006-01")
-		if _, ok := monthlyActivityByUser[msg.Sender]; !ok {
-			monthlyActivityByUser[msg.Sender] = make(map[string]int)
+	tokens := countTokensAsync(messagesData)
+	tally := conversationKernel(timestamps, senderCodes, int64(convoBreakMinutes)*60, len(sortedUsers))
+
+	userMessageCounts := make([]int, len(sortedUsers))
+	userFirstTexts := make([]int, len(sortedUsers)) // Count per day
+
+	// monthly activity covers every month from the earliest to the latest
+	// message, gaps included, so a month's row is found by arithmetic on
+	// year*12 + month; monthCounts[month][user]
+	earliest, latest := 0, 0
+	for i, ts := range timestamps {
+		if ts < timestamps[earliest] {
+			earliest = i
 		}
-		monthlyActivityByUser[msg.Sender][monthStr]++
-		allMonths[monthStr] = struct{}{}
+		if ts > timestamps[latest] {
+			latest = i
+		}
+	}
+	startYear, startMonth, _ := messagesData[earliest].Timestamp.Date()
+	endYear, endMonth, _ := messagesData[latest].Timestamp.Date()
+	startKey := startYear*12 + int(startMonth)
+	numMonths := endYear*12 + int(endMonth) - startKey + 1
+	months := make([]string, numMonths)
+	monthCounts := make([][]int, numMonths)
+	monthCells := make([]int, numMonths*len(sortedUsers))
+	for m := range months {
+		months[m] = time.Date(startYear, startMonth+time.Month(m), 1, 0, 0, 0, 0, time.UTC).Format("2006-01")
+		monthCounts[m] = monthCells[m*len(sortedUsers) : (m+1)*len(sortedUsers) : (m+1)*len(sortedUsers)]
+	}
+	var currentMonthCounts []int
+
+	var weekday int
+	lastYear, lastMonth, lastDay := 0, time.Month(0), 0
 
-		if i+1 < len(messagesData) && messagesData[i+1].Sender == msg.Sender {
-			userIgnoredCount[msg.Sender]++
+	for i, msg := range messagesData {
+		code := senderCodes[i]
+		userMessageCounts[code]++
+
+		// first text per day; the weekday is only recomputed when the
+		// calendar day changes and the month row only when the month does
+		year, month, day := msg.Timestamp.Date()
+		if day != lastDay || month != lastMonth || year != lastYear {
+			userFirstTexts[code]++
+			if month != lastMonth || year != lastYear {
+				currentMonthCounts = monthCounts[year*12+int(month)-startKey]
+			}
+			weekday = int(msg.Timestamp.Weekday())
+			lastYear, lastMonth, lastDay = year, month, day
 		}
 
-		lastSender = msg.Sender
-		lastTimestamp = msg.Timestamp
+		hourlyMessageCount[msg.Timestamp.Hour()]++
+		dailyMessageCountByWeekday[weekday]++
 
+		currentMonthCounts[code]++
 	}
 
-	if currentStreakSender != "" && currentStreakCount > maxMonologueCount {
-		maxMonologueCount = currentStreakCount
-		maxMonologueSender = currentStreakSender
+	tokenTally := tokens()
+
+	maxMonologueSender := ""
+	if tally.maxMonologueCode >= 0 {
+		maxMonologueSender = sortedUsers[tally.maxMonologueCode]
 	}
 
 	totalMessages := len(messagesData)
 
-	mostActiveUsersPct := make(PercentageMap)
-	for user, count := range userMessageCount {
-		mostActiveUsersPct[user] = roundFloat(float64(count)*100.0/float64(totalMessages), 2)
-	}
-
-	totalStarts := 0
-	for _, count := range userStartsConvo {
-		totalStarts += count
-	}
+	// all per-user maps are filled in one pass over the user codes
+	userMessageCount := make(UserMessageCount, len(sortedUsers))
+	mostActiveUsersPct := make(PercentageMap, len(sortedUsers))
 	conversationStartersPct := make(PercentageMap)
-	if totalStarts > 0 {
-		for user, count := range userStartsConvo {
-			conversationStartersPct[user] = roundFloat(float64(count)*100.0/float64(totalStarts), 2)
-		}
-	}
-
-	totalIgnored := 0
-	for _, count := range userIgnoredCount {
-		totalIgnored += count
-	}
 	mostIgnoredUsersPct := make(PercentageMap)
-	if totalIgnored > 0 {
-		for user, count := range userIgnoredCount {
-			mostIgnoredUsersPct[user] = roundFloat(float64(count)*100.0/float64(totalIgnored), 2)
+	for code, user := range sortedUsers {
+		count := userMessageCounts[code]
+		userMessageCount[user] = count
+		mostActiveUsersPct[user] = roundFloat(float64(count)*100.0/float64(totalMessages), 2)
+		if starts := tally.startsConvo[code]; starts > 0 {
+			conversationStartersPct[user] = roundFloat(float64(starts)*100.0/float64(tally.totalStarts), 2)
+		}
+		if ignored := tally.ignored[code]; ignored > 0 {
+			mostIgnoredUsersPct[user] = roundFloat(float64(ignored)*100.0/float64(tally.totalIgnored), 2)
 		}
 	}
 
 	// first texter
 	firstTextChampion := ChampionInfo{}
 	maxFirstTexts := -1
-	for user, count := range userFirstTexts {
+	for code, count := range userFirstTexts {
 		if count > maxFirstTexts {
 			maxFirstTexts = count
-			firstTextChampion.User = user
+			firstTextChampion.User = sortedUsers[code]
 			firstTextChampion.Count = count
 		}
 	}
 
 	// avg response time
 	averageResponseTimeMinutes := 0.0
-	if responseCount > 0 {
-		averageResponseTimeMinutes = roundFloat((totalResponseTimeSeconds/float64(responseCount))/60.0, 2)
+	if tally.responseCount > 0 {
+		averageResponseTimeMinutes = roundFloat((float64(tally.totalResponseSeconds)/float64(tally.responseCount))/60.0, 2)
 	}
 
 	// peak hour
 	var peakHour *int
-	maxHourCount := -1
+	maxHourCount := 0
 	for hour, count := range hourlyMessageCount {
 		if count > maxHourCount {
 			maxHourCount = count
@@ -358,11 +627,9 @@ func calculateChatStatistics(messagesData []ParsedMessage, convoBreakMinutes int
 		}
 	}
 
-	// days active
-	daysActive := 0
-	if !firstMessageTimestamp.IsZero() && !latestMessageTimestamp.IsZero() {
-		daysActive = int(latestMessageTimestamp.Sub(firstMessageTimestamp).Hours()/24) + 1
-	}
+	// days active: whole 24h periods between the first and last message, from the Unix
+	// seconds already collected for the kernel
+	daysActive := int((timestamps[len(timestamps)-1]-timestamps[0])/(24*3600)) + 1
 
 	stats := &ChatStatistics{
 		TotalMessages:              totalMessages,
@@ -372,45 +639,39 @@ func calculateChatStatistics(messagesData []ParsedMessage, convoBreakMinutes int
 		ConversationStartersPct:    conversationStartersPct,
 		MostIgnoredUsersPct:        mostIgnoredUsersPct,
 		FirstTextChampion:          firstTextChampion,
-		LongestMonologue:           ChampionInfo{User: maxMonologueSender, Count: maxMonologueCount},
-		CommonWords:                countTopN(wordCounter, 10),
-		CommonEmojis:               countTopN(emojiCounter, 6),
+		LongestMonologue:           ChampionInfo{User: maxMonologueSender, Count: tally.maxMonologueCount},
+		CommonWords:                countTopN(tokenTally.words, 10),
+		CommonEmojis:               countTopN(tokenTally.emojis, 6),
 		AverageResponseTimeMinutes: averageResponseTimeMinutes,
 		PeakHour:                   peakHour,
-		UserMonthlyActivity:        getMonthlyActivity(monthlyActivityByUser, allMonths, maps.Keys(userMessageCount)),
+		UserMonthlyActivity:        getMonthlyActivity(months, monthCounts, sortedUsers),
 		WeekdayVsWeekendAvg:        calcWeekdayWeekendAvg(dailyMessageCountByWeekday),
-		UserInteractionMatrix:      formatInteractionMatrix(interactionMatrix, maps.Keys(userMessageCount)),
+		UserInteractionMatrix:      formatInteractionMatrix(tally.interactions, sortedUsers),
 	}
 
 	return stats, nil
 }
 
-func getMonthlyActivity(monthlyActivityByUser UserStringIntMap, allMonths map[string]struct{}, allUsersList []string) []UserActivityChartData {
-	if len(allMonths) == 0 || len(allUsersList) == 0 {
+// getMonthlyActivity builds one chart series per user with a point for every
+// month. months is in chronological order and monthCounts[m][u] is the count
+// for months[m] and sortedUsers[u].
+func getMonthlyActivity(months []string, monthCounts [][]int, sortedUsers []string) []UserActivityChartData {
+	if len(months) == 0 || len(sortedUsers) == 0 {
 		return []UserActivityChartData{}
 	}
 
 	userMonthlyStats := []UserActivityChartData{}
-	sortedMonths := maps.Keys(allMonths)
-	sort.Strings(sortedMonths)
-	sort.Strings(allUsersList)
-
-	for _, user := range allUsersList {
+	for code, user := range sortedUsers {
 		userData := []GraphPoint{}
-		userActivity, userExists := monthlyActivityByUser[user]
-		for _, monthStr := range sortedMonths {
-			count := 0
-			if userExists {
-				count = userActivity[monthStr]
-			}
-			userData = append(userData, GraphPoint{X: monthStr, Y: count})
+		for m, monthStr := range months {
+			userData = append(userData, GraphPoint{X: monthStr, Y: monthCounts[m][code]})
 		}
 		userMonthlyStats = append(userMonthlyStats, UserActivityChartData{ID: user, Data: userData})
 	}
 	return userMonthlyStats
 }
 
-func calcWeekdayWeekendAvg(dailyMessageCountByWeekday map[int]int) WeekdayWeekendAverage {
+func calcWeekdayWeekendAvg(dailyMessageCountByWeekday [7]int) WeekdayWeekendAverage {
 	totalWeekday := 0
 	totalWeekend := 0
 
@@ -446,36 +707,30 @@ func calcWeekdayWeekendAvg(dailyMessageCountByWeekday map[int]int) WeekdayWeeken
 	}
 }
 
-func formatInteractionMatrix(interactionMatrix InteractionMatrix, allUsersList []string) [][]interface{} {
-	if len(allUsersList) <= 1 {
+func formatInteractionMatrix(interactionMatrix InteractionMatrix, sortedUsers []string) [][]interface{} {
+	if len(sortedUsers) <= 1 {
 		return nil
 	}
 
-	sortedUsers := make([]string, len(allUsersList))
-	copy(sortedUsers, allUsersList)
-	sort.Strings(sortedUsers)
+	// header plus one row per user, all windows over a single cell array
+	width := len(sortedUsers) + 1
+	cells := make([]interface{}, width*width)
+	listOfListsMatrix := make([][]interface{}, width)
+	for r := range listOfListsMatrix {
+		listOfListsMatrix[r] = cells[r*width : (r+1)*width : (r+1)*width]
+	}
 
-	matrixHeader := make([]interface{}, len(sortedUsers)+1)
-	matrixHeader[0] = nil
+	matrixHeader := listOfListsMatrix[0]
 	for i, user := range sortedUsers {
 		matrixHeader[i+1] = user
 	}
 
-	listOfListsMatrix := [][]interface{}{matrixHeader}
-
-	for _, sender := range sortedUsers {
-		row := make([]interface{}, len(sortedUsers)+1)
+	for i, sender := range sortedUsers {
+		row := listOfListsMatrix[i+1]
 		row[0] = sender
-
-		senderInteractions, senderExists := interactionMatrix[sender]
-		for j, target := range sortedUsers {
-			count := 0
-			if senderExists {
-				count = senderInteractions[target]
-			}
+		for j, count := range interactionMatrix[i] {
 			row[j+1] = count
 		}
-		listOfListsMatrix = append(listOfListsMatrix, row)
 	}
 
 	return listOfListsMatrix
@@ -6,85 +6,72 @@ import (
 	"encoding/json"
 	"errors"
 	"fmt"
-	"io"
 	"log"
 	"math/rand"
 	"os"
 	"path/filepath"
-	"regexp"
 	"sort"
 	"strings"
+	"sync"
 	"time"
 	"unicode"
+	"unicode/utf8"
 
 	"golang.org/x/exp/maps"
 )
 
 type ParsedMessage struct {
 	Timestamp       time.Time
-	DateStr         string
 	Sender          string
-	CleanedMessage  string
+	CleanedMessage  string // lowercased, stopwords and links removed
 	OriginalMessage string
 }
 
 var (
 	stopwordsSet          map[string]struct{}
+	longestStopword       int // bytes; longer words skip the stopword lookup
 	systemMessagePatterns []string
-	timestampPattern      *regexp.Regexp
-	urlPattern            *regexp.Regexp
-	emojiPattern          *regexp.Regexp
-	excessiveCharsPattern *regexp.Regexp
+	systemMessageMatcher  *substringMatcher
 	timestampParseLayouts []string
 )
 
+// attachmentMarkers are the placeholders WhatsApp leaves for media, matched
+// like the system message patterns against the lowercased message.
+var attachmentMarkers = []string{"<attached:", " omitted>", "omitted media"}
+
 const (
-	dataDir                 = "data"
-	stopwordsFile           = "stopwords.txt"
-	systemMessagesFile      = "system_message_patterns.json"
-	allowedPunctuationRegex = `.,?!'"()`
-	maxLinesToSniff         = 100
+	dataDir            = "data"
+	stopwordsFile      = "stopwords.txt"
+	systemMessagesFile = "system_message_patterns.json"
+	allowedPunctuation = `.,?!'"()`
+	maxLinesToSniff    = 100
+
+	// messages up to shortMessageBytes long have their cleaned text cached,
+	// for at most maxCachedShortMessages distinct messages per parse
+	shortMessageBytes      = 32
+	maxCachedShortMessages = 4096
 )
 
 func init() {
-	timestampPattern = regexp.MustCompile(
-		`(?i)^\s*(?:\x{200e})?` + // Optional LRM at start, optional space
-			`\[?` + // Optional opening bracket
-			`(\d{1,2}/\d{1,2}/\d{2,4})` + // Date (Group 1)
-			`,\s*` + // Comma and space separator
-			`(\d{1,2}:\d{2}(?::\d{2})?(?:[\s\x{202f}](?:AM|PM))?)` + // Time (Group 2) - handles space or \u202f, optional secs
-			`(?:\]?\s*-\s*|\]\s*)` + // Separator (non-capturing)
-			`(.*?):\s*` + // Sender (Group 3) - Non-greedy match for sender name
-			`(.*)`) // Message (Group 4) - Rest of the line
-
-	urlPattern = regexp.MustCompile(`https?://\S+|www\.\S+`)
-
-	emojiPattern = regexp.MustCompile("[" +
-		"\U0001F300-\U0001F5FF" + // symbols & pictographs
-		"\U0001F600-\U0001F64F" + // emoticons
-		"\U0001F680-\U0001F6FF" + // transport & map symbols
-		"\U0001F1E0-\U0001F1FF" + // flags (iOS)
-		"\U00002700-\U000027BF" + // Dingbats
-		"\U00002600-\U000026FF" + // Miscellaneous Symbols
-		"\U0000FE00-\U0000FE0F" + // Variation Selectors
-		"\U0001F900-\U0001F9FF" + // Supplemental Symbols and Pictographs
-		"]+")
-
-	escapedPunctuation := regexp.QuoteMeta(allowedPunctuationRegex)
-	excessiveCharsPattern = regexp.MustCompile(`[^a-zA-Z0-9\s` + escapedPunctuation + `]`)
-
 	var err error
 	stopwordsSet, err = loadStopwords(filepath.Join(dataDir, stopwordsFile))
 	if err != nil {
 		log.Printf("Warning: Failed to load stopwords: %v. Proceeding without stopword removal.", err)
 		stopwordsSet = make(map[string]struct{})
 	}
+	for word := range stopwordsSet {
+		longestStopword = max(longestStopword, len(word))
+	}
 
 	systemMessagePatterns, err = loadSystemMessagePatterns(filepath.Join(dataDir, systemMessagesFile))
 	if err != nil {
 		log.Printf("Warning: Failed to load system message patterns: %v", err)
 		systemMessagePatterns = []string{}
 	}
+	// attachment placeholders are filtered even without the patterns file,
+	// in the same scan as the loaded patterns
+	matcherPatterns := append([]string{}, systemMessagePatterns...)
+	systemMessageMatcher = newSubstringMatcher(append(matcherPatterns, attachmentMarkers...))
 
 	timestampParseLayouts = []string{
 		// US style with AM/PM
@@ -161,24 +148,138 @@ func loadSystemMessagePatterns(filepath string) ([]string, error) {
 	return lowerCasePatterns, nil
 }
 
-func sniffTimestampLayouts(reader io.Reader, allLayouts []string, maxLines int) ([]string, error) {
-	scanner := bufio.NewScanner(reader)
+// nextLine splits the first line off data, dropping the newline. Unlike
+// bufio.Scanner it copies nothing and has no line length limit; callers trim
+// surrounding whitespace, including any trailing \r, themselves.
+func nextLine(data []byte) (line, rest []byte) {
+	if i := bytes.IndexByte(data, '\n'); i >= 0 {
+		return data[:i], data[i+1:]
+	}
+	return data, nil
+}
+
+// matchTimestampLine splits a message line into its date, time, sender and
+// message parts. It is a hand-written equivalent of the pattern
+//
+//	(?i)^\s*(?:\x{200e})?\[?(\d{1,2}/\d{1,2}/\d{2,4}),\s*
+//	(\d{1,2}:\d{2}(?::\d{2})?(?:[\s\x{202f}](?:AM|PM))?)
+//	(?:\]?\s*-\s*|\]\s*)(.*?):\s*(.*)
+//
+// and returns the same groups for every line that pattern matches. Each
+// piece of the pattern can only match one way given what must follow it, so
+// a single forward scan replaces the regexp engine's backtracking.
+func matchTimestampLine(line string) (date, clock, sender, message string, ok bool) {
+	i := skipRegexpSpace(line, 0)
+	if strings.HasPrefix(line[i:], "\u200e") {
+		i += len("\u200e")
+	}
+	if i < len(line) && line[i] == '[' {
+		i++
+	}
+
+	// date: d{1,2}/d{1,2}/d{2,4}
+	dateStart := i
+	if i = digitRun(line, i, 1, 2); i < 0 || i >= len(line) || line[i] != '/' {
+		return
+	}
+	if i = digitRun(line, i+1, 1, 2); i < 0 || i >= len(line) || line[i] != '/' {
+		return
+	}
+	if i = digitRun(line, i+1, 2, 4); i < 0 || i >= len(line) || line[i] != ',' {
+		return
+	}
+	date = line[dateStart:i]
+	i = skipRegexpSpace(line, i+1)
+
+	// time: h{1,2}:mm, optional :ss, optional AM/PM after a space or U+202F
+	clockStart := i
+	if i = digitRun(line, i, 1, 2); i < 0 || i >= len(line) || line[i] != ':' {
+		return
+	}
+	if i = digitRun(line, i+1, 2, 2); i < 0 {
+		return
+	}
+	if i < len(line) && line[i] == ':' {
+		if i = digitRun(line, i+1, 2, 2); i < 0 {
+			return
+		}
+	}
+	spaceLen := 0
+	if i < len(line) && isRegexpSpace(line[i]) {
+		spaceLen = 1
+	} else if strings.HasPrefix(line[i:], "\u202f") {
+		spaceLen = len("\u202f")
+	}
+	if spaceLen > 0 && i+spaceLen+2 <= len(line) {
+		if meridiem := line[i+spaceLen : i+spaceLen+2]; strings.EqualFold(meridiem, "AM") || strings.EqualFold(meridiem, "PM") {
+			i += spaceLen + 2
+		}
+	}
+	clock = line[clockStart:i]
+
+	// separator: "] - ", " - " or "] "
+	j := i
+	if j < len(line) && line[j] == ']' {
+		j++
+	}
+	if j = skipRegexpSpace(line, j); j < len(line) && line[j] == '-' {
+		i = skipRegexpSpace(line, j+1)
+	} else if i < len(line) && line[i] == ']' {
+		i = skipRegexpSpace(line, i+1)
+	} else {
+		return
+	}
+
+	// sender runs up to the first colon, the message is the rest
+	colon := strings.IndexByte(line[i:], ':')
+	if colon < 0 {
+		return
+	}
+	sender = line[i : i+colon]
+	message = line[skipRegexpSpace(line, i+colon+1):]
+	return date, clock, sender, message, true
+}
+
+// isRegexpSpace reports whether b is in the regexp \s class, [\t\n\f\r ].
+func isRegexpSpace(b byte) bool {
+	return b == ' ' || b == '\t' || b == '\n' || b == '\f' || b == '\r'
+}
+
+func skipRegexpSpace(s string, i int) int {
+	for i < len(s) && isRegexpSpace(s[i]) {
+		i++
+	}
+	return i
+}
+
+// digitRun returns the index just past the run of ASCII digits starting at
+// s[i], or -1 if the run is shorter than minLen or longer than maxLen.
+func digitRun(s string, i, minLen, maxLen int) int {
+	start := i
+	for i < len(s) && s[i] >= '0' && s[i] <= '9' {
+		i++
+	}
+	if n := i - start; n < minLen || n > maxLen {
+		return -1
+	}
+	return i
+}
+
+func sniffTimestampLayouts(data []byte, allLayouts []string, maxLines int) ([]string, error) {
 	var sampleLines []string
 	linesRead := 0
 
-	for (maxLines <= 0 || linesRead < maxLines) && scanner.Scan() {
-		line := scanner.Text()
-		trimmedLine := strings.TrimSpace(line)
+	for rest := data; (maxLines <= 0 || linesRead < maxLines) && len(rest) > 0; {
+		var line []byte
+		line, rest = nextLine(rest)
+		trimmedLine := string(bytes.TrimSpace(line))
 		trimmedLine = strings.TrimPrefix(trimmedLine, "\u200e")
 
-		if timestampPattern != nil && timestampPattern.MatchString(trimmedLine) {
+		if _, _, _, _, ok := matchTimestampLine(trimmedLine); ok {
 			sampleLines = append(sampleLines, trimmedLine)
 		}
 		linesRead++
 	}
-	if err := scanner.Err(); err != nil {
-		return nil, fmt.Errorf("error reading lines for sniffing: %w", err)
-	}
 
 	if len(sampleLines) == 0 {
 		// log.Printf("Warning: No lines matched the general timestamp pattern during sniffing in the first %d lines. Cannot determine specific layout.", maxLines)
@@ -195,15 +296,15 @@ func sniffTimestampLayouts(reader io.Reader, allLayouts []string, maxLines int)
 			break
 		}
 
-		match := timestampPattern.FindStringSubmatch(line)
-		if match == nil || len(match) != 5 {
+		dateStr, timeStr, _, _, ok := matchTimestampLine(line)
+		if !ok {
 			continue
 		}
 		actualTimestampsProcessed++
 
-		dateStr := strings.TrimSpace(match[1])
-		timeStr := strings.TrimSpace(match[2])
-		timeCleaned := strings.ToUpper(strings.ReplaceAll(timeStr, "\u202f", " "))
+		dateStr = strings.TrimSpace(dateStr)
+		timeStr = strings.TrimSpace(timeStr)
+		timeCleaned := cleanClock(timeStr)
 		datetimeStr := dateStr + " " + timeCleaned
 
 		currentlyValidLayouts := []string{}
@@ -257,14 +358,11 @@ func sniffTimestampLayouts(reader io.Reader, allLayouts []string, maxLines int)
 	return candidateLayouts, nil
 }
 
-func preprocessMessages(reader io.Reader) (int, []ParsedMessage, error) {
-	buf, err := io.ReadAll(reader)
-	if err != nil {
-		return 0, nil, fmt.Errorf("failed to read input for buffering: %w", err)
-	}
-
-	sniffReader := bytes.NewReader(buf)
-	currentTimestampParseLayouts, err := sniffTimestampLayouts(sniffReader, timestampParseLayouts, maxLinesToSniff)
+// preprocessMessages parses the raw chat export. Lines are split directly
+// over data and every string kept is copied out of it, so the caller may
+// reuse data once this returns.
+func preprocessMessages(data []byte) (int, []ParsedMessage, error) {
+	currentTimestampParseLayouts, err := sniffTimestampLayouts(data, timestampParseLayouts, maxLinesToSniff)
 
 	if err != nil || len(currentTimestampParseLayouts) == 0 {
 		log.Printf("Warning: Timestamp sniffing failed (%v) or returned no layouts. Falling back to all %d global layouts.", err, len(timestampParseLayouts))
@@ -276,192 +374,500 @@ func preprocessMessages(reader io.Reader) (int, []ParsedMessage, error) {
 		log.Printf("Using determined timestamp layouts for parsing: %v", currentTimestampParseLayouts)
 	}
 
+	layouts := compileTimestampLayouts(currentTimestampParseLayouts)
+	rawMessageCount, messagesData := parseMessagesAsync(data, layouts)
+
+	log.Printf("Preprocessing complete. Raw messages counted: %d, Parsed messages for analysis: %d", rawMessageCount, len(messagesData))
+
+	return rawMessageCount, messagesData, nil
+}
+
+// parseMessageLines parses the messages in data, which must begin at the
+// start of a line, under the given layouts. It returns the number of
+// messages, one per timestamp line whether or not it parses or passes the
+// filters, and the messages kept for analysis.
+func parseMessageLines(data []byte, layouts []timestampLayout) (int, []ParsedMessage) {
 	messagesData := []ParsedMessage{}
-	mainScanner := bufio.NewScanner(bytes.NewReader(buf))
 	lineNumber := 0
 	rawMessageCount := 0
 
-	for mainScanner.Scan() {
+	// a message runs from its timestamp line up to the next one, so it is
+	// held here until then to collect any continuation lines
+	var pending ParsedMessage
+	hasPending := false // pending passed the filters and still needs cleaning
+	// once pending has continuation lines, its text is built up here and
+	// turned into a string once, rather than copied again for every line
+	var continued []byte
+	senderNames := make(map[string]string)
+
+	// when every layout reads day and month in the same order, any layout
+	// that accepts a timestamp gives the same time, so the one that parsed
+	// the previous line is tried first and the search is skipped while the
+	// export keeps one format
+	canLock := sameFieldOrder(layouts)
+	lockedLayout := -1
+	var days dayCache
+	// short messages like "ok" or "haha" repeat constantly, so their cleaned
+	// text is remembered rather than recomputed
+	cleanedShort := make(map[string]string)
+	flushPending := func() {
+		if !hasPending {
+			return
+		}
+		hasPending = false
+		if len(continued) > 0 {
+			pending.OriginalMessage = string(continued)
+			continued = continued[:0]
+		}
+		var cleanedMessage string
+		if len(pending.OriginalMessage) > shortMessageBytes {
+			cleanedMessage = cleanTextRemoveStopwords(pending.OriginalMessage)
+		} else if cached, seen := cleanedShort[pending.OriginalMessage]; seen {
+			cleanedMessage = cached
+		} else {
+			cleanedMessage = cleanTextRemoveStopwords(pending.OriginalMessage)
+			if len(cleanedShort) < maxCachedShortMessages {
+				cleanedShort[pending.OriginalMessage] = cleanedMessage
+			}
+		}
+		if cleanedMessage != "" {
+			pending.CleanedMessage = cleanedMessage
+			messagesData = append(messagesData, pending)
+		}
+	}
+
+	for rest := data; len(rest) > 0; {
+		var rawLine []byte
+		rawLine, rest = nextLine(rest)
 		lineNumber++
-		line := mainScanner.Text()
-		line = strings.TrimSpace(line)
+		rawLine = bytes.TrimSpace(rawLine)
 
-		if line == "" {
+		if len(rawLine) == 0 {
 			continue
 		}
-		rawMessageCount++
+		line := string(rawLine)
 
 		line = strings.TrimPrefix(line, "\u200e")
 
-		if timestampPattern == nil {
-			return rawMessageCount, nil, fmt.Errorf("timestampPattern regex is not initialized")
-		}
-		match := timestampPattern.FindStringSubmatch(line)
-		if match == nil || len(match) != 5 {
+		dateStr, timeStr, sender, message, ok := matchTimestampLine(line)
+		if !ok {
+			// a line without a timestamp belongs to the message above. Lines
+			// before the first timestamp belong to no message and aren't
+			// counted.
+			if hasPending {
+				if len(continued) == 0 {
+					continued = append(continued, pending.OriginalMessage...)
+				}
+				continued = append(continued, '\n')
+				continued = append(continued, line...)
+			}
 			continue
 		}
+		rawMessageCount++
+		flushPending()
 
-		dateStr := strings.TrimSpace(match[1])
-		timeStr := strings.TrimSpace(match[2])
-		sender := strings.TrimSpace(match[3])
-		message := strings.TrimSpace(match[4])
+		dateStr = strings.TrimSpace(dateStr)
+		timeStr = strings.TrimSpace(timeStr)
+		sender = strings.TrimSpace(sender)
+		message = strings.TrimSpace(message)
 
 		message = strings.TrimPrefix(message, "\u200e")
 
-		isSystemMessage := false
-		lowerCaseMessage := strings.ToLower(message)
-		for _, pattern := range systemMessagePatterns {
-			if strings.Contains(lowerCaseMessage, pattern) {
-				isSystemMessage = true
-				break
-			}
-		}
-		if isSystemMessage || strings.Contains(message, "<attached:") || strings.Contains(message, " omitted>") || strings.Contains(message, "omitted media") {
+		if systemMessageMatcher.MatchString(strings.ToLower(message)) {
 			continue
 		}
 
 		var timestamp time.Time
-		var parseError error
 		parsed := false
-		timeCleaned := strings.ToUpper(strings.ReplaceAll(timeStr, "\u202f", " "))
-		datetimeStr := dateStr + " " + timeCleaned
+		timeCleaned := cleanClock(timeStr)
 
-		for _, layout := range currentTimestampParseLayouts {
-			hasSecondsLayout := strings.Contains(layout, ":05")
+		if lockedLayout >= 0 {
+			timestamp, parsed = days.parse(&layouts[lockedLayout], dateStr, timeCleaned)
+		}
+		if !parsed {
+			// only layouts with the same shape as the timestamp can parse it
+			hasLongYearData := len(dateStr)-strings.LastIndexByte(dateStr, '/')-1 == 4
 			hasSecondsData := strings.Count(timeCleaned, ":") >= 2
-			hasAmPmLayout := strings.Contains(layout, " PM")
 			hasAmPmData := strings.HasSuffix(timeCleaned, " AM") || strings.HasSuffix(timeCleaned, " PM")
+			for i := range layouts {
+				if layouts[i].longYear != hasLongYearData || layouts[i].seconds != hasSecondsData || layouts[i].twelveHour != hasAmPmData {
+					continue
+				}
 
-			if hasSecondsLayout != hasSecondsData || hasAmPmLayout != hasAmPmData {
-				continue
-			}
-
-			timestamp, parseError = time.Parse(layout, datetimeStr)
-			if parseError == nil {
-				parsed = true
-				break
+				timestamp, parsed = days.parse(&layouts[i], dateStr, timeCleaned)
+				if parsed {
+					if canLock {
+						lockedLayout = i
+					}
+					break
+				}
 			}
 		}
 
 		if !parsed {
-			// log.Printf("Line %d: Failed to parse timestamp '%s' with available layouts.", lineNumber, datetimeStr)
+			// log.Printf("Line %d: Failed to parse timestamp '%s %s' with available layouts.", lineNumber, dateStr, timeCleaned)
 			continue
 		}
 
-		cleanedMessage := cleanTextRemoveStopwords(message)
-
-		if cleanedMessage != "" {
-			messagesData = append(messagesData, ParsedMessage{
-				Timestamp:       timestamp,
-				DateStr:         dateStr,
-				Sender:          sender,
-				CleanedMessage:  cleanedMessage,
-				OriginalMessage: message,
-			})
+		// every message from a sender shares one copy of the name, so the
+		// sender-keyed lookups later on compare equal names by pointer
+		if interned, seen := senderNames[sender]; seen {
+			sender = interned
 		} else {
+			sender = strings.Clone(sender)
+			senderNames[sender] = sender
 		}
+
+		pending = ParsedMessage{
+			Timestamp:       timestamp,
+			Sender:          sender,
+			OriginalMessage: message,
+		}
+		hasPending = true
 	}
+	flushPending()
+
+	return rawMessageCount, messagesData
+}
 
-	if err := mainScanner.Err(); err != nil {
-		return rawMessageCount, messagesData, fmt.Errorf("error reading data stream: %w", err)
+// parseMessagesAsync splits data into chunks that each begin at a timestamp
+// line, so no message straddles two chunks, and parses them on goroutines
+// that each hold a spare CPU slot while the caller parses the first. Each
+// chunk covers at least heavyPreprocessBytes. When the export is too small or
+// no slot is free, everything is parsed on the caller's goroutine.
+func parseMessagesAsync(data []byte, layouts []timestampLayout) (int, []ParsedMessage) {
+	maxWorkers := len(data)/heavyPreprocessBytes - 1
+	workers := 0
+acquire:
+	for workers < maxWorkers {
+		select {
+		case cpuSlots <- struct{}{}:
+			workers++
+		default:
+			break acquire
+		}
+	}
+	chunks := splitAtMessageStarts(data, workers+1)
+	for ; workers > len(chunks)-1; workers-- {
+		<-cpuSlots // a boundary fell inside a long message; hand the slot back
+	}
+	if workers == 0 {
+		return parseMessageLines(data, layouts)
 	}
 
-	log.Printf("Preprocessing complete. Raw messages counted: %d, Parsed messages for analysis: %d", rawMessageCount, len(messagesData))
+	counts := make([]int, len(chunks))
+	results := make([][]ParsedMessage, len(chunks))
+	var wg sync.WaitGroup
+	for w := 1; w < len(chunks); w++ {
+		wg.Add(1)
+		go func(w int) {
+			defer wg.Done()
+			defer func() { <-cpuSlots }()
+			counts[w], results[w] = parseMessageLines(chunks[w], layouts)
+		}(w)
+	}
+	counts[0], results[0] = parseMessageLines(chunks[0], layouts)
+	wg.Wait()
 
-	return rawMessageCount, messagesData, nil
+	rawMessageCount, total := 0, 0
+	for w := range chunks {
+		rawMessageCount += counts[w]
+		total += len(results[w])
+	}
+	messagesData := make([]ParsedMessage, 0, total)
+	for _, msgs := range results {
+		messagesData = append(messagesData, msgs...)
+	}
+	return rawMessageCount, messagesData
+}
+
+// splitAtMessageStarts cuts data into at most n chunks of roughly equal size,
+// moving each cut forward to the start of the next timestamp line.
+func splitAtMessageStarts(data []byte, n int) [][]byte {
+	chunks := make([][]byte, 0, n)
+	start := 0
+	for i := 1; i < n; i++ {
+		cut := nextMessageStart(data, max(start, len(data)*i/n))
+		if cut >= len(data) {
+			break
+		}
+		chunks = append(chunks, data[start:cut])
+		start = cut
+	}
+	return append(chunks, data[start:])
+}
+
+// nextMessageStart returns the offset of the first timestamp line that
+// starts after offset, or len(data) if there is none.
+func nextMessageStart(data []byte, offset int) int {
+	i := bytes.IndexByte(data[offset:], '\n')
+	if i < 0 {
+		return len(data)
+	}
+	for pos := offset + i + 1; pos < len(data); {
+		line, rest := nextLine(data[pos:])
+		trimmedLine := strings.TrimPrefix(string(bytes.TrimSpace(line)), "\u200e")
+		if _, _, _, _, ok := matchTimestampLine(trimmedLine); ok {
+			return pos
+		}
+		pos = len(data) - len(rest)
+	}
+	return len(data)
 }
-func removeLinks(text string) string {
-	return urlPattern.ReplaceAllString(text, "")
+
+// linkLength returns the length of the link starting at text[0], or 0 if none
+// does. A link is http://, https:// or www. followed by at least one byte
+// that isn't an ASCII space, and runs up to the next ASCII space, the same
+// text `https?://\S+|www\.\S+` matches.
+func linkLength(text string) int {
+	var prefix int
+	switch {
+	case strings.HasPrefix(text, "http://"):
+		prefix = len("http://")
+	case strings.HasPrefix(text, "https://"):
+		prefix = len("https://")
+	case strings.HasPrefix(text, "www."):
+		prefix = len("www.")
+	default:
+		return 0
+	}
+	n := prefix
+	for n < len(text) && !isRegexpSpace(text[n]) {
+		n++
+	}
+	if n == prefix {
+		return 0
+	}
+	return n
 }
 
+// isEmojiRune reports whether r falls in one of the emoji ranges counted and
+// stripped during analysis.
+func isEmojiRune(r rune) bool {
+	switch {
+	case r >= 0x1F300 && r <= 0x1F64F, // symbols & pictographs, emoticons
+		r >= 0x1F680 && r <= 0x1F6FF, // transport & map symbols
+		r >= 0x1F1E0 && r <= 0x1F1FF, // flags (iOS)
+		r >= 0x2600 && r <= 0x27BF,   // Miscellaneous Symbols, Dingbats
+		r >= 0xFE00 && r <= 0xFE0F,   // Variation Selectors
+		r >= 0x1F900 && r <= 0x1F9FF: // Supplemental Symbols and Pictographs
+		return true
+	}
+	return false
+}
+
+// isEmojiModifier reports whether r attaches to the preceding emoji: a
+// variation selector or a skin tone modifier.
+func isEmojiModifier(r rune) bool {
+	return (r >= 0xFE00 && r <= 0xFE0F) || (r >= 0x1F3FB && r <= 0x1F3FF)
+}
+
+// removeEmojis drops every emoji rune from text. Runs of other bytes are copied
+// through untouched, invalid UTF-8 included, and text without emojis is
+// returned as is.
 func removeEmojis(text string) string {
-	return emojiPattern.ReplaceAllString(text, "")
+	var stripped []byte
+	kept := 0 // text[:kept] has been dealt with
+	for i := 0; i < len(text); {
+		// every emoji rune is at least U+2600, so its UTF-8 encoding starts
+		// with a byte of at least 0xE2; lower bytes are skipped undecoded
+		if text[i] < 0xE2 {
+			i++
+			continue
+		}
+		r, size := utf8.DecodeRuneInString(text[i:])
+		if isEmojiRune(r) {
+			if stripped == nil {
+				stripped = make([]byte, 0, len(text))
+			}
+			stripped = append(stripped, text[kept:i]...)
+			kept = i + size
+		}
+		i += size
+	}
+	if stripped == nil {
+		return text
+	}
+	return string(append(stripped, text[kept:]...))
 }
 
-func normalizeWord(word string) string {
-	trimmed := strings.Trim(word, string(stringPunctuation))
-	return strings.ToLower(trimmed)
+func isStopword(word []byte) bool {
+	_, ok := stopwordsSet[string(word)]
+	return ok
+}
+
+// appendNormalizedWord appends word to dst lowercased and with its surrounding
+// punctuation trimmed. ASCII words are lowercased as they are copied, so only
+// words with other characters go through strings.ToLower.
+func appendNormalizedWord(dst []byte, word string) []byte {
+	start, end := 0, len(word)
+	for start < end && isStringPunctuation[word[start]] {
+		start++
+	}
+	for end > start && isStringPunctuation[word[end-1]] {
+		end--
+	}
+	word = word[start:end]
+	for i := 0; i < len(word); i++ {
+		if word[i] >= utf8.RuneSelf {
+			return append(dst, strings.ToLower(word)...)
+		}
+	}
+	for i := 0; i < len(word); i++ {
+		c := word[i]
+		if 'A' <= c && c <= 'Z' {
+			c += 'a' - 'A'
+		}
+		dst = append(dst, c)
+	}
+	return dst
 }
 
 const stringPunctuation = "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"
 
-func cleanTextRemoveStopwords(text string) string {
-	text = removeLinks(text)
-	text = strings.TrimSpace(text)
-	if text == "" {
-		return ""
+// isStringPunctuation marks the bytes of stringPunctuation, so words are
+// trimmed by table lookup instead of rebuilding a cutset on every call.
+var isStringPunctuation = func() (table [256]bool) {
+	for i := 0; i < len(stringPunctuation); i++ {
+		table[stringPunctuation[i]] = true
 	}
+	return table
+}()
+
+// cleanTextRemoveStopwords drops links from text and keeps the words that,
+// lowercased and stripped of surrounding punctuation, are longer than two
+// bytes and not stopwords. Links are cut and words split in the same walk
+// over text, and kept words are written straight into the result.
+func cleanTextRemoveStopwords(text string) string {
+	cleaned := make([]byte, 0, len(text))
+	for i := 0; i < len(text); {
+		r, size := rune(text[i]), 1
+		if r >= utf8.RuneSelf {
+			r, size = utf8.DecodeRuneInString(text[i:])
+		}
+		if unicode.IsSpace(r) {
+			i += size
+			continue
+		}
 
-	words := strings.Fields(text)
-	filteredWords := make([]string, 0, len(words))
+		// a word ends at whitespace, or where a link starts since the link
+		// runs on to the next ASCII space
+		start, end := i, -1
+		for i < len(text) {
+			if c := text[i]; c == 'h' || c == 'w' {
+				if n := linkLength(text[i:]); n > 0 {
+					end = i
+					i += n
+					break
+				}
+			}
+			r, size := rune(text[i]), 1
+			if r >= utf8.RuneSelf {
+				r, size = utf8.DecodeRuneInString(text[i:])
+			}
+			if unicode.IsSpace(r) {
+				break
+			}
+			i += size
+		}
+		if end < 0 {
+			end = i
+		}
 
-	for _, word := range words {
-		normalized := normalizeWord(word)
-		_, isStopword := stopwordsSet[normalized]
-		if !isStopword && len(normalized) > 2 && normalized != "" {
-			filteredWords = append(filteredWords, normalized)
+		// the word is normalized in place at the end of the result and cut
+		// off again if it isn't kept
+		mark, wordStart := len(cleaned), len(cleaned)
+		if mark > 0 {
+			cleaned = append(cleaned, ' ')
+			wordStart++
+		}
+		cleaned = appendNormalizedWord(cleaned, text[start:end])
+		normalized := cleaned[wordStart:]
+		if len(normalized) <= 2 || (len(normalized) <= longestStopword && isStopword(normalized)) {
+			cleaned = cleaned[:mark]
 		}
 	}
-	return strings.Join(filteredWords, " ")
+	return string(cleaned)
 }
 
+// isAllowedSampleByte marks the bytes a sampled message may consist of: ASCII
+// letters and digits, whitespace and allowedPunctuation. Every byte of a
+// non-ASCII character is left unmarked.
+var isAllowedSampleByte = func() (table [256]bool) {
+	for b := 0; b < 256; b++ {
+		c := byte(b)
+		table[b] = 'a' <= c && c <= 'z' || 'A' <= c && c <= 'Z' || '0' <= c && c <= '9' ||
+			isRegexpSpace(c) || strings.IndexByte(allowedPunctuation, c) >= 0
+	}
+	return table
+}()
+
+// containsExcessiveSpecialChars reports whether text has any character other
+// than those isAllowedSampleByte marks.
 func containsExcessiveSpecialChars(text string) bool {
-	return excessiveCharsPattern.MatchString(text)
+	for i := 0; i < len(text); i++ {
+		if !isAllowedSampleByte[text[i]] {
+			return true
+		}
+	}
+	return false
 }
 
 type Topic []ParsedMessage
 
-func groupMessagesByTopic(data []ParsedMessage, gapHours float64) []Topic {
+// groupMessagesByTopic splits data, which must be in timestamp order, into
+// topics wherever the gap between consecutive messages reaches gapHours, and
+// strips emojis from the messages it keeps. timestamps holds data's Unix-second
+// timestamps.
+func groupMessagesByTopic(data []ParsedMessage, timestamps []int64, gapHours float64) []Topic {
 	if len(data) == 0 {
 		return []Topic{}
 	}
 
-	sort.SliceStable(data, func(i, j int) bool {
-		return data[i].Timestamp.Before(data[j].Timestamp)
-	})
-
-	groupedTopicsRaw := []Topic{}
-	currentTopicRaw := Topic{data[0]}
+	// timestamps are whole seconds, so a gap of at least gapDuration is a
+	// gap of at least gapDuration rounded up to a second
 	gapDuration := time.Duration(gapHours * float64(time.Hour))
-
-	for i := 1; i < len(data); i++ {
-		prevTime := data[i-1].Timestamp
-		currTime := data[i].Timestamp
-		timeDiff := currTime.Sub(prevTime)
-
-		if timeDiff >= gapDuration {
-			if len(currentTopicRaw) > 0 {
-				groupedTopicsRaw = append(groupedTopicsRaw, currentTopicRaw)
-			}
-			currentTopicRaw = Topic{}
-		}
-		currentTopicRaw = append(currentTopicRaw, data[i])
-	}
-
-	if len(currentTopicRaw) > 0 {
-		groupedTopicsRaw = append(groupedTopicsRaw, currentTopicRaw)
+	gapSeconds := int64(gapDuration / time.Second)
+	if gapDuration%time.Second > 0 {
+		gapSeconds++
 	}
 
+	// topics are split and cleaned in one pass. Kept messages share one
+	// backing array, each topic a capped run of it.
+	bounds := topicBounds(timestamps, gapSeconds)
+	kept := make([]ParsedMessage, 0, len(data))
 	processedTopics := []Topic{}
-	for _, rawTopic := range groupedTopicsRaw {
-		processedTopic := Topic{}
-		for _, msg := range rawTopic {
+	for i := 1; i < len(bounds); i++ {
+		topicStart := len(kept)
+		for _, msg := range data[bounds[i-1]:bounds[i]] {
 			emojiFree := removeEmojis(msg.CleanedMessage)
 			emojiFree = strings.TrimSpace(emojiFree)
 			if emojiFree != "" {
-				msgCopy := msg
-				msgCopy.CleanedMessage = emojiFree
-				processedTopic = append(processedTopic, msgCopy)
+				msg.CleanedMessage = emojiFree
+				kept = append(kept, msg)
 			}
 		}
-		if len(processedTopic) > 0 {
-			processedTopics = append(processedTopics, processedTopic)
+		if len(kept) > topicStart {
+			processedTopics = append(processedTopics, Topic(kept[topicStart:len(kept):len(kept)]))
 		}
 	}
 
 	return processedTopics
 }
 
+// topicBounds returns the indices at which topics start, followed by
+// len(timestamps): a new topic starts wherever consecutive timestamps are at
+// least gapSeconds apart.
+func topicBounds(timestamps []int64, gapSeconds int64) []int {
+	bounds := []int{0}
+	for i := 1; i < len(timestamps); i++ {
+		if timestamps[i]-timestamps[i-1] >= gapSeconds {
+			bounds = append(bounds, i)
+		}
+	}
+	return append(bounds, len(timestamps))
+}
+
 func stratifyMessages(topics []Topic) map[string][]string {
 	consolidatedMessages := make(map[string][]string)
 
@@ -474,29 +880,34 @@ func stratifyMessages(topics []Topic) map[string][]string {
 			if trimmedMsg == "" {
 				continue
 			}
-			if len(strings.Fields(trimmedMsg)) < 3 {
-				continue
-			}
-			isNumeric := true
+			// count words and classify the characters in one pass
+			words := 0
+			inWord := false
+			isNumeric := true // only digits, spaces, '.' and ','
 			hasDigit := false
+			hasAlphanum := false
 			for _, r := range trimmedMsg {
-				if unicode.IsDigit(r) {
-					hasDigit = true
-				} else if !unicode.IsSpace(r) && r != '.' && r != ',' {
+				isSpace := unicode.IsSpace(r)
+				if !isSpace && !inWord {
+					words++
+				}
+				inWord = !isSpace
+				switch {
+				case unicode.IsDigit(r):
+					hasDigit, hasAlphanum = true, true
+				case unicode.IsLetter(r):
+					hasAlphanum, isNumeric = true, false
+				case !isSpace && r != '.' && r != ',':
 					isNumeric = false
-					break
 				}
 			}
-			if isNumeric && hasDigit {
+			// only messages of more than seven words are ever sampled, so
+			// shorter ones are dropped here rather than collected
+			if words <= 7 {
 				continue
 			}
-
-			hasAlphanum := false
-			for _, r := range trimmedMsg {
-				if unicode.IsLetter(r) || unicode.IsDigit(r) {
-					hasAlphanum = true
-					break
-				}
+			if isNumeric && hasDigit {
+				continue
 			}
 			if !hasAlphanum {
 				continue
@@ -506,9 +917,6 @@ func stratifyMessages(topics []Topic) map[string][]string {
 				continue
 			}
 
-			if _, ok := consolidatedMessages[sender]; !ok {
-				consolidatedMessages[sender] = []string{}
-			}
 			consolidatedMessages[sender] = append(consolidatedMessages[sender], trimmedMsg)
 		}
 	}
@@ -519,28 +927,22 @@ func stratifyMessages(topics []Topic) map[string][]string {
 	senders := maps.Keys(consolidatedMessages)
 	sort.Strings(senders)
 
-	r := rand.New(rand.NewSource(time.Now().UnixNano()))
-
 	for _, sender := range senders {
-		msgs := consolidatedMessages[sender]
-		eligibleMsgs := make([]string, 0, len(msgs))
-		for _, msg := range msgs {
-			if len(strings.Fields(msg)) > 7 {
-				eligibleMsgs = append(eligibleMsgs, msg)
-			}
-		}
-
+		eligibleMsgs := consolidatedMessages[sender]
 		if len(eligibleMsgs) > 0 {
-			r.Shuffle(len(eligibleMsgs), func(i, j int) {
+			// only the first maxMessagesPerSender places are drawn, which is
+			// the Fisher-Yates shuffle stopped early: a uniform sample in
+			// random order, without shuffling messages that aren't kept. The
+			// package-level source is seeded at startup and safe for
+			// concurrent use, so no per-call generator needs allocating and
+			// seeding.
+			sampleSize := min(len(eligibleMsgs), maxMessagesPerSender)
+			for i := 0; i < sampleSize; i++ {
+				j := i + rand.Intn(len(eligibleMsgs)-i)
 				eligibleMsgs[i], eligibleMsgs[j] = eligibleMsgs[j], eligibleMsgs[i]
-			})
-
-			selectedMsgs := eligibleMsgs
-			if len(eligibleMsgs) > maxMessagesPerSender {
-				selectedMsgs = eligibleMsgs[:maxMessagesPerSender]
 			}
 
-			finalSampled[sender] = selectedMsgs
+			finalSampled[sender] = eligibleMsgs[:sampleSize]
 		}
 	}
 
@@ -0,0 +1,369 @@
+package main
+
+import (
+	"math/rand"
+	"reflect"
+	"regexp"
+	"runtime"
+	"strings"
+	"testing"
+	"time"
+	"unicode"
+)
+
+// timestampPattern is the regexp matchTimestampLine replaced, kept here as
+// the reference it must agree with.
+var timestampPattern = regexp.MustCompile(
+	`(?i)^\s*(?:\x{200e})?` + // Optional LRM at start, optional space
+		`\[?` + // Optional opening bracket
+		`(\d{1,2}/\d{1,2}/\d{2,4})` + // Date (Group 1)
+		`,\s*` + // Comma and space separator
+		`(\d{1,2}:\d{2}(?::\d{2})?(?:[\s\x{202f}](?:AM|PM))?)` + // Time (Group 2) - handles space or  , optional secs
+		`(?:\]?\s*-\s*|\]\s*)` + // Separator (non-capturing)
+		`(.*?):\s*` + // Sender (Group 3) - Non-greedy match for sender name
+		`(.*)`) // Message (Group 4) - Rest of the line
+
+// urlPattern and referenceCleanText are the link removal and word pipeline
+// cleanTextRemoveStopwords replaced.
+var urlPattern = regexp.MustCompile(`https?://\S+|www\.\S+`)
+
+func referenceCleanText(text string) string {
+	text = urlPattern.ReplaceAllString(text, "")
+	text = strings.TrimSpace(text)
+	if text == "" {
+		return ""
+	}
+	words := strings.Fields(text)
+	filteredWords := make([]string, 0, len(words))
+	for _, word := range words {
+		normalized := strings.ToLower(strings.Trim(word, stringPunctuation))
+		_, isStopword := stopwordsSet[normalized]
+		if !isStopword && len(normalized) > 2 {
+			filteredWords = append(filteredWords, normalized)
+		}
+	}
+	return strings.Join(filteredWords, " ")
+}
+
+func checkTimestampLine(t *testing.T, line string) {
+	t.Helper()
+	want := timestampPattern.FindStringSubmatch(line)
+	date, clock, sender, message, ok := matchTimestampLine(line)
+	if ok != (want != nil) {
+		t.Fatalf("%q: matched %v, pattern matched %v", line, ok, want != nil)
+	}
+	if ok && (date != want[1] || clock != want[2] || sender != want[3] || message != want[4]) {
+		t.Fatalf("%q: got %q, pattern gave %q", line, []string{date, clock, sender, message}, want[1:])
+	}
+}
+
+func TestMatchTimestampLineMatchesPattern(t *testing.T) {
+	lines := []string{
+		"12/31/23, 10:30 PM - John: hi",
+		"12/31/23, 10:30 pm - John: hi",
+		"[31/12/2023, 22:30:15] Jane: yo",
+		"\u200e[1/2/24, 9:05:01 am] A B: c: d",
+		"[1/2/24, 9:05:01\u202fPM] A B: c: d",
+		"1/2/24, 9:05\u202fam - x: y",
+		"\u200e 1/2/24, 9:05 - Team: lead: msg",
+		"1/2/24, 9:05 - no colon here",
+		"1/2/24, 9:05 -a:b",
+		"1/2/24,9:05 Am - x: y",
+		"1/2/24, 9:05] - x: y",
+		"123/2/24, 9:05 - x: y",
+	}
+	for _, line := range lines {
+		checkTimestampLine(t, line)
+	}
+
+	// mutate well-formed lines and build random ones from the pieces the
+	// pattern cares about
+	pieces := []string{
+		"1", "12", "123", "2024", "/", ",", ", ", ":", " ", "\t", "\u202f", "\u200e",
+		"[", "]", "-", " - ", "AM", "pm", "aM", "x", "John", ": ", "\r", "\xff", "é", "\v",
+	}
+	r := rand.New(rand.NewSource(1))
+	for n := 0; n < 200000; n++ {
+		var line string
+		if r.Intn(2) == 0 {
+			b := []byte(lines[r.Intn(len(lines))])
+			for k := r.Intn(3) + 1; k > 0; k-- {
+				p := r.Intn(len(b) + 1)
+				switch r.Intn(3) {
+				case 0:
+					insert := pieces[r.Intn(len(pieces))]
+					b = append(b[:p:p], append([]byte(insert), b[p:]...)...)
+				case 1:
+					if p < len(b) {
+						b = append(b[:p:p], b[p+1:]...)
+					}
+				case 2:
+					if p < len(b) {
+						b[p] = "0123456789:/,- ]["[r.Intn(17)]
+					}
+				}
+			}
+			line = string(b)
+		} else {
+			var b strings.Builder
+			for k := r.Intn(12); k > 0; k-- {
+				b.WriteString(pieces[r.Intn(len(pieces))])
+			}
+			line = b.String()
+		}
+		checkTimestampLine(t, line)
+	}
+}
+
+func TestPreprocessMessagesMultiLine(t *testing.T) {
+	chat := "12/31/23, 10:30 PM - John: first line\n" +
+		"second line\n" +
+		"\n" +
+		"third line\n" +
+		"12/31/23, 10:31 PM - Jane: reply\n"
+	count, messages, err := preprocessMessages([]byte(chat))
+	if err != nil {
+		t.Fatal(err)
+	}
+	if count != 2 || len(messages) != 2 {
+		t.Fatalf("got %d messages, %d kept, want 2", count, len(messages))
+	}
+	if want := "first line\nsecond line\nthird line"; messages[0].OriginalMessage != want {
+		t.Errorf("got %q, want %q", messages[0].OriginalMessage, want)
+	}
+	if messages[1].Sender != "Jane" || messages[1].OriginalMessage != "reply" {
+		t.Errorf("got %+v", messages[1])
+	}
+}
+
+func TestPreprocessMessagesPreamble(t *testing.T) {
+	chat := "WhatsApp Chat with Team\n" +
+		"exported on some date\n" +
+		"12/31/23, 10:30 PM - John: pizza tonight\n" +
+		"12/31/23, 10:31 PM - Jane: guitar practice\n"
+	count, messages, err := preprocessMessages([]byte(chat))
+	if err != nil {
+		t.Fatal(err)
+	}
+	if count != 2 || len(messages) != 2 {
+		t.Fatalf("got %d messages, %d kept, want 2", count, len(messages))
+	}
+	if messages[0].OriginalMessage != "pizza tonight" {
+		t.Errorf("preamble leaked into the first message: %q", messages[0].OriginalMessage)
+	}
+}
+
+func TestPreprocessMessagesLongMessage(t *testing.T) {
+	const lines = 100000
+	var chat strings.Builder
+	chat.WriteString("12/31/23, 10:30 PM - John: pizza\n")
+	for i := 0; i < lines; i++ {
+		chat.WriteString("another line of a very long message\n")
+	}
+	chat.WriteString("12/31/23, 10:31 PM - Jane: guitar\n")
+	data := []byte(chat.String())
+
+	// joining the lines one at a time would allocate about
+	// lines*len(data)/2 bytes; building the text once stays linear
+	var before, after runtime.MemStats
+	runtime.ReadMemStats(&before)
+	count, messages, err := preprocessMessages(data)
+	runtime.ReadMemStats(&after)
+	if err != nil {
+		t.Fatal(err)
+	}
+	if count != 2 || len(messages) != 2 {
+		t.Fatalf("got %d messages, %d kept, want 2", count, len(messages))
+	}
+	if got := strings.Count(messages[0].OriginalMessage, "\n"); got != lines {
+		t.Errorf("got %d continuation lines, want %d", got, lines)
+	}
+	if allocated := after.TotalAlloc - before.TotalAlloc; allocated > 20*uint64(len(data)) {
+		t.Errorf("allocated %d bytes to parse %d", allocated, len(data))
+	}
+}
+
+func TestParseMessagesAsyncMatchesSequential(t *testing.T) {
+	r := rand.New(rand.NewSource(1))
+	users := []string{"John", "Jane Doe", "Team: Lead"}
+	var chat []byte
+	at := time.Date(2023, 1, 1, 9, 0, 0, 0, time.UTC)
+	for len(chat) < 3*heavyPreprocessBytes {
+		at = at.Add(time.Duration(r.Intn(90)) * time.Minute)
+		header := at.Format("1/2/06, 3:04 PM") + " - " + users[r.Intn(len(users))] + ": "
+		switch r.Intn(6) {
+		case 0:
+			chat = append(chat, header+"pizza tonight\nguitar practice\n\nmeeting tomorrow\n"...)
+		case 1:
+			chat = append(chat, header+"changed the subject to \"plans\"\n"...)
+		case 2:
+			// matches the timestamp pattern but is no valid date
+			chat = append(chat, "13/45/23, 10:30 PM - John: weekend concert\ncontinued\n"...)
+		case 3:
+			chat = append(chat, "\u200e"+header+"<attached: photo.jpg>\n"...)
+		default:
+			chat = append(chat, header+"birthday party weekend\n"...)
+		}
+	}
+
+	layouts := compileTimestampLayouts([]string{"1/2/06 3:04 PM"})
+	wantCount, want := parseMessageLines(chat, layouts)
+	if wantCount == len(want) {
+		t.Fatal("export has no skipped messages")
+	}
+	for n := 2; n <= 32; n++ {
+		chunks := splitAtMessageStarts(chat, n)
+		if len(chunks) != n {
+			t.Fatalf("split into %d chunks, want %d", len(chunks), n)
+		}
+		count := 0
+		var got []ParsedMessage
+		for i, chunk := range chunks {
+			first, _ := nextLine(chunk)
+			if _, _, _, _, ok := matchTimestampLine(strings.TrimPrefix(string(first), "\u200e")); i > 0 && !ok {
+				t.Fatalf("%d chunks: chunk %d starts inside a message: %q", n, i, first)
+			}
+			c, msgs := parseMessageLines(chunk, layouts)
+			count += c
+			got = append(got, msgs...)
+		}
+		if count != wantCount || !reflect.DeepEqual(got, want) {
+			t.Errorf("%d chunks: got %d messages, %d kept, want %d, %d", n, count, len(got), wantCount, len(want))
+		}
+	}
+
+	count, got := parseMessagesAsync(chat, layouts)
+	if count != wantCount || !reflect.DeepEqual(got, want) {
+		t.Errorf("got %d messages, %d kept, want %d, %d", count, len(got), wantCount, len(want))
+	}
+	if len(cpuSlots) != 0 {
+		t.Errorf("%d CPU slots still held", len(cpuSlots))
+	}
+}
+
+func TestCleanTextRemoveStopwordsMatchesReference(t *testing.T) {
+	// stopwords at the length limits of the lookup
+	var shortest, longest string
+	for word := range stopwordsSet {
+		if len(word) == 3 && (shortest == "" || word < shortest) {
+			shortest = word
+		}
+		if len(word) > len(longest) || (len(word) == len(longest) && word < longest) {
+			longest = word
+		}
+	}
+	if shortest == "" {
+		t.Fatal("no three-letter stopwords loaded")
+	}
+	texts := []string{
+		"see https://example.com/a?b=c, then www.example.org.",
+		"link:https://x.io/path!!! and (www.site.com) ok",
+		"http:/ not a link, https: neither, www without dot",
+		"WHY did you call at 12:30?? it's 2024 now",
+		"don't won't y'all 'quoted' \"double\"",
+		"Ünïcode café İstanbul naïve résumé",
+		"😀 emoji😀word ... !!! ?? 123 4567",
+		"tabs\tand\nnewlines\u00a0and\u0085odd\u2003spaces",
+		shortest + " " + strings.ToUpper(longest) + " " + longest + "s " + longest[1:] + " x" + longest,
+	}
+	for _, text := range texts {
+		if got, want := cleanTextRemoveStopwords(text), referenceCleanText(text); got != want {
+			t.Errorf("%q: got %q, want %q", text, got, want)
+		}
+	}
+
+	pieces := []string{
+		"http://", "https://", "www.", "http:/", "https:", "ww", "w", "h", "http", "s", ":", "/", ".",
+		" ", "\t", "\n", "\v", "\u00a0", "\u0085", "\u2003", "the", "and", "Hello", "WORLD,", "(ok)",
+		"it's", "'", "42", "2024!", "😀", "é", "\xff", "a", "xyz", "THE", "Ünï", "İx", "!!", "abc.def",
+		shortest, longest, strings.ToUpper(longest), longest + "x",
+	}
+	r := rand.New(rand.NewSource(1))
+	for n := 0; n < 200000; n++ {
+		var b strings.Builder
+		for k := r.Intn(12); k > 0; k-- {
+			b.WriteString(pieces[r.Intn(len(pieces))])
+		}
+		text := b.String()
+		if got, want := cleanTextRemoveStopwords(text), referenceCleanText(text); got != want {
+			t.Fatalf("%q: got %q, want %q", text, got, want)
+		}
+	}
+}
+
+// emojiPattern is the regexp removeEmojis and countEmojis replaced.
+var emojiPattern = regexp.MustCompile("[" +
+	"\U0001F300-\U0001F5FF" + // symbols & pictographs
+	"\U0001F600-\U0001F64F" + // emoticons
+	"\U0001F680-\U0001F6FF" + // transport & map symbols
+	"\U0001F1E0-\U0001F1FF" + // flags (iOS)
+	"\U00002700-\U000027BF" + // Dingbats
+	"\U00002600-\U000026FF" + // Miscellaneous Symbols
+	"\U0000FE00-\U0000FE0F" + // Variation Selectors
+	"\U0001F900-\U0001F9FF" + // Supplemental Symbols and Pictographs
+	"]+")
+
+// referenceCountEmojis is the emoji tally countEmojis replaced.
+func referenceCountEmojis(text string) map[string]int {
+	counter := map[string]int{}
+	for _, emojiMatch := range emojiPattern.FindAllString(text, -1) {
+		runes := []rune(emojiMatch)
+		for i := 0; i < len(runes); i++ {
+			currentEmoji := string(runes[i])
+			if i+1 < len(runes) {
+				nextRune := runes[i+1]
+				if unicode.Is(unicode.Mn, nextRune) || unicode.Is(unicode.Sk, nextRune) ||
+					(nextRune >= 0x1F3FB && nextRune <= 0x1F3FF) {
+					currentEmoji += string(nextRune)
+					i++
+				}
+			}
+			counter[currentEmoji]++
+		}
+	}
+	return counter
+}
+
+func checkEmojis(t *testing.T, text string) {
+	t.Helper()
+	if got, want := removeEmojis(text), emojiPattern.ReplaceAllString(text, ""); got != want {
+		t.Fatalf("removeEmojis(%q) = %q, want %q", text, got, want)
+	}
+	got := map[string]int{}
+	countEmojis(text, got)
+	if want := referenceCountEmojis(text); !reflect.DeepEqual(got, want) {
+		t.Fatalf("countEmojis(%q) = %q, want %q", text, got, want)
+	}
+}
+
+func TestEmojisMatchPattern(t *testing.T) {
+	texts := []string{
+		"",
+		"just plain ascii, nothing else 123",
+		"café Привет 日本語 ‘quoted’ — dash… ™ ← arrows",
+		"family 👨\u200d👩\u200d👧\u200d👦 and couple 👩\u200d❤\ufe0f\u200d👨",
+		"thumbs 👍🏽👍🏿 wave 👋🏻x",
+		"flags 🇮🇳🇺🇸 and one 🇬",
+		"keycaps 1\ufe0f\u20e3 #\ufe0f\u20e3 *\u20e3",
+		"hearts ❤\ufe0f❤ ♥\ufe0f ☀ ✂ ➿",
+		"edges ◿ ⟀ \U0001F650 \U0001F6FF \U0001F900 \U0001F9FF",
+		"stray selector \ufe0f and tone \U0001F3FB alone",
+		"broken \xe2\x9d \xf0\x9f\x98 \xff 😀",
+	}
+	for _, text := range texts {
+		checkEmojis(t, text)
+	}
+
+	pieces := []string{
+		"a", " ", "😀", "❤", "\ufe0f", "\u200d", "\u20e3", "\U0001F3FB", "\U0001F3FF", "\U0001F1EE",
+		"◿", "⟀", "é", "’", "\xff", "\xe2", "\xf0\x9f", "🤖", "\U0001F650", "1",
+	}
+	r := rand.New(rand.NewSource(1))
+	for n := 0; n < 100000; n++ {
+		var b strings.Builder
+		for k := r.Intn(10); k > 0; k-- {
+			b.WriteString(pieces[r.Intn(len(pieces))])
+		}
+		checkEmojis(t, b.String())
+	}
+}
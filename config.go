@@ -17,12 +17,14 @@ type Config struct {
 	MaxConcurrentAnalyses int
 	MaxConcurrentAICalls  int
 	AIQueueTimeout        time.Duration
+	AnalysisQueueTimeout  time.Duration
 	TempDirRoot           string
 	MaxTempFileAge        time.Duration
 	MaxUploadSizeBytes    int64
 	AnalysisTimeout       time.Duration
 	APIKey                string
 	OpenAIAPIKey          string
+	DebugLogging          bool
 }
 
 func LoadConfig() (*Config, error) {
@@ -103,6 +105,16 @@ func LoadConfig() (*Config, error) {
 		maxConcurrentAICalls = 3
 	}
 
+	maxConcurrentAnalysesStr := os.Getenv("MAX_CONCURRENT_ANALYSES")
+	if maxConcurrentAnalysesStr == "" {
+		maxConcurrentAnalysesStr = "50"
+	}
+	maxConcurrentAnalyses, err := strconv.Atoi(maxConcurrentAnalysesStr)
+	if err != nil || maxConcurrentAnalyses <= 0 {
+		log.Printf("Warning: Invalid MAX_CONCURRENT_ANALYSES value '%s'. Using default 50. Error: %v", maxConcurrentAnalysesStr, err)
+		maxConcurrentAnalyses = 50
+	}
+
 	aiQueueTimeoutStr := os.Getenv("AI_QUEUE_TIMEOUT_SECONDS")
 	if aiQueueTimeoutStr == "" {
 		aiQueueTimeoutStr = "20"
@@ -113,15 +125,37 @@ func LoadConfig() (*Config, error) {
 		aiQueueTimeoutSec = 20
 	}
 
+	analysisQueueTimeoutStr := os.Getenv("ANALYSIS_QUEUE_TIMEOUT_SECONDS")
+	if analysisQueueTimeoutStr == "" {
+		analysisQueueTimeoutStr = "20"
+	}
+	analysisQueueTimeoutSec, err := strconv.Atoi(analysisQueueTimeoutStr)
+	if err != nil || analysisQueueTimeoutSec < 0 {
+		log.Printf("Warning: Invalid ANALYSIS_QUEUE_TIMEOUT_SECONDS value '%s'. Using default 20. Error: %v", analysisQueueTimeoutStr, err)
+		analysisQueueTimeoutSec = 20
+	}
+
+	debugLogging := false
+	if debugLoggingStr := os.Getenv("DEBUG_LOGGING"); debugLoggingStr != "" {
+		debugLogging, err = strconv.ParseBool(debugLoggingStr)
+		if err != nil {
+			log.Printf("Warning: Invalid DEBUG_LOGGING value '%s'. Using default false. Error: %v", debugLoggingStr, err)
+			debugLogging = false
+		}
+	}
+
 	return &Config{
-		Host:                 host,
-		Port:                 port,
-		MaxConcurrentAICalls: maxConcurrentAICalls,
-		AIQueueTimeout:       time.Duration(aiQueueTimeoutSec) * time.Second,
-		TempDirRoot:          tempDirRoot,
-		MaxTempFileAge:       time.Duration(maxAgeSec) * time.Second,
-		MaxUploadSizeBytes:   maxUploadSizeBytes,
-		AnalysisTimeout:      time.Duration(analysisTimeoutSec) * time.Second,
-		APIKey:               apiKey,
+		Host:                  host,
+		Port:                  port,
+		MaxConcurrentAnalyses: maxConcurrentAnalyses,
+		MaxConcurrentAICalls:  maxConcurrentAICalls,
+		AIQueueTimeout:        time.Duration(aiQueueTimeoutSec) * time.Second,
+		AnalysisQueueTimeout:  time.Duration(analysisQueueTimeoutSec) * time.Second,
+		TempDirRoot:           tempDirRoot,
+		MaxTempFileAge:        time.Duration(maxAgeSec) * time.Second,
+		MaxUploadSizeBytes:    maxUploadSizeBytes,
+		AnalysisTimeout:       time.Duration(analysisTimeoutSec) * time.Second,
+		DebugLogging:          debugLogging,
+		APIKey:                apiKey,
 	}, nil
 }
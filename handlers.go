@@ -1,12 +1,18 @@
 package main
 
 import (
+	"bytes"
 	"context"
+	"encoding/json"
 	"errors"
 	"fmt"
+	"io"
 	"log"
+	"mime/multipart"
 	"net/http"
+	"strconv"
 	"strings"
+	"sync"
 	"sync/atomic" // Added for reading activeAICallsCount
 
 	"github.com/gin-gonic/gin"
@@ -14,16 +20,140 @@ import (
 
 var ErrAIQueueTimeout = errors.New("AI analysis queue is full, server is busy")
 
+// uploadBufferPool recycles the buffers uploads are read into. Preprocessing
+// copies everything it keeps out of the buffer, so it can be reused as soon
+// as the handler returns.
+var uploadBufferPool = sync.Pool{
+	New: func() any { return new([]byte) },
+}
+
+// maxPooledUploadBytes is the largest buffer kept in uploadBufferPool. A
+// buffer grown for a rare large upload is left to the garbage collector
+// rather than pinned in the pool.
+const maxPooledUploadBytes = 4 << 20
+
+// jsonBufferPool recycles the buffers responses are encoded into.
+var jsonBufferPool = sync.Pool{
+	New: func() any { return new(bytes.Buffer) },
+}
+
+// writeJSON encodes v into a pooled buffer and sends it with an explicit
+// Content-Length. Unlike c.JSON it doesn't marshal into a fresh byte slice per
+// response, and since nothing is written until encoding succeeds, a failure
+// becomes a 500 instead of an empty 200. The body goes out in one write
+// rather than as a chunked stream.
+func writeJSON(c *gin.Context, status int, v any) {
+	buf := jsonBufferPool.Get().(*bytes.Buffer)
+	defer jsonBufferPool.Put(buf)
+	buf.Reset()
+	if err := json.NewEncoder(buf).Encode(v); err != nil {
+		log.Printf("Error encoding JSON response: %v", err)
+		c.AbortWithStatusJSON(http.StatusInternalServerError, gin.H{"detail": "Failed to encode analysis result."})
+		return
+	}
+	c.Header("Content-Length", strconv.Itoa(buf.Len()))
+	c.Data(status, "application/json; charset=utf-8", buf.Bytes())
+}
+
+var (
+	errUploadTooLarge = errors.New("uploaded file exceeds the size limit")
+	errNoFilePart     = errors.New("request has no file part")
+)
+
+// readUploadPart streams the multipart part named field from r into buf,
+// growing it as needed, and returns the part's filename and bytes. Parts
+// before it are skipped without being buffered. It stops with
+// errUploadTooLarge as soon as more than limit bytes have been read.
+func readUploadPart(r *http.Request, field string, buf []byte, limit int64) (string, []byte, error) {
+	mr, err := r.MultipartReader()
+	if err != nil {
+		return "", buf[:0], err
+	}
+
+	var part *multipart.Part
+	for {
+		part, err = mr.NextPart()
+		if err == io.EOF {
+			return "", buf[:0], errNoFilePart
+		}
+		if err != nil {
+			return "", buf[:0], err
+		}
+		if part.FormName() == field {
+			break
+		}
+		part.Close()
+	}
+	defer part.Close()
+
+	// the body length bounds the part size, so use it to size the buffer once
+	if hint := min(r.ContentLength, limit+1); hint > int64(cap(buf)) {
+		buf = make([]byte, 0, hint)
+	}
+	data := buf[:0]
+	src := io.LimitReader(part, limit+1)
+	for {
+		if len(data) == cap(data) {
+			data = append(data, 0)[:len(data)]
+		}
+		n, err := src.Read(data[len(data):cap(data)])
+		data = data[:len(data)+n]
+		if err == io.EOF {
+			break
+		}
+		if err != nil {
+			return part.FileName(), data, err
+		}
+	}
+	if int64(len(data)) > limit {
+		return part.FileName(), data, errUploadTooLarge
+	}
+	return part.FileName(), data, nil
+}
+
 func healthCheckHandler(c *gin.Context) {
 	queuedAITasks := len(aiTaskQueue)
 	maxConcurrentAITasks := cap(aiTaskQueue)
 	processingAITasks := atomic.LoadInt32(&activeAICallsCount)
+	activeAnalyses, analysisCapacity, waitingAnalyses := analysisAdmission.Stats()
 
 	c.JSON(http.StatusOK, gin.H{
 		"status":                   "ok",
 		"ai_tasks_queued":          queuedAITasks,
 		"ai_tasks_processing":      processingAITasks,
 		"ai_tasks_worker_capacity": maxConcurrentAITasks,
+		"analyses_active":          activeAnalyses,
+		"analyses_waiting":         waitingAnalyses,
+		"analyses_capacity":        analysisCapacity,
+	})
+}
+
+type concurrencyUpdate struct {
+	MaxConcurrentAnalyses int `json:"max_concurrent_analyses"`
+}
+
+// updateConcurrencyHandler changes how many analyses may run at once without
+// a restart. Lowering the limit lets running analyses finish; raising it
+// admits queued requests right away.
+func updateConcurrencyHandler(c *gin.Context) {
+	var req concurrencyUpdate
+	if err := c.ShouldBindJSON(&req); err != nil {
+		c.AbortWithStatusJSON(http.StatusBadRequest, gin.H{"detail": "Invalid request body."})
+		return
+	}
+	if req.MaxConcurrentAnalyses <= 0 {
+		c.AbortWithStatusJSON(http.StatusBadRequest, gin.H{"detail": "max_concurrent_analyses must be a positive integer."})
+		return
+	}
+
+	analysisAdmission.SetCapacity(req.MaxConcurrentAnalyses)
+	log.Printf("Max concurrent analyses set to %d", req.MaxConcurrentAnalyses)
+
+	activeAnalyses, analysisCapacity, waitingAnalyses := analysisAdmission.Stats()
+	c.JSON(http.StatusOK, gin.H{
+		"analyses_active":   activeAnalyses,
+		"analyses_waiting":  waitingAnalyses,
+		"analyses_capacity": analysisCapacity,
 	})
 }
 
@@ -31,17 +161,32 @@ func analyzeHandler(c *gin.Context) {
 	clientHost := c.ClientIP()
 	logPrefix := fmt.Sprintf("[Req from %s]", clientHost)
 
-	// get file header
-	fileHeader, err := c.FormFile("file")
+	// read the file part straight off the request body into a pooled buffer.
+	// Going through FormFile would first copy the whole part into the parsed
+	// form and then again into our buffer.
+	bufPtr := uploadBufferPool.Get().(*[]byte)
+	defer uploadBufferPool.Put(bufPtr)
+	filename, chatData, err := readUploadPart(c.Request, "file", *bufPtr, config.MaxUploadSizeBytes)
+	if cap(chatData) > cap(*bufPtr) && cap(chatData) <= maxPooledUploadBytes {
+		*bufPtr = chatData[:0]
+	}
+	if errors.Is(err, errUploadTooLarge) {
+		log.Printf("%s Rejected upload: file exceeds limit %d bytes.", logPrefix, config.MaxUploadSizeBytes)
+		c.AbortWithStatusJSON(http.StatusRequestEntityTooLarge, gin.H{
+			"detail": fmt.Sprintf("Maximum request body size limit exceeded (%.1f MB)", float64(config.MaxUploadSizeBytes)/(1024*1024)),
+		})
+		return
+	}
 	if err != nil {
 		log.Printf("%s Error getting form file: %v", logPrefix, err)
 		c.AbortWithStatusJSON(http.StatusBadRequest, gin.H{"detail": "Could not get file from request"})
 		return
 	}
 
-	filename := fileHeader.Filename
 	logPrefix = fmt.Sprintf("[Req from %s | File: %s]", clientHost, filename)
-	log.Printf("%s Received analysis request. Content-Type: %s", logPrefix, fileHeader.Header.Get("Content-Type"))
+	if config.DebugLogging {
+		log.Printf("%s Received analysis request. Content-Type: %s", logPrefix, c.GetHeader("Content-Type"))
+	}
 
 	// validate filename
 	if filename == "" {
@@ -55,19 +200,47 @@ func analyzeHandler(c *gin.Context) {
 		return
 	}
 
-	uploadedFile, err := fileHeader.Open()
-	if err != nil {
-		log.Printf("%s Error opening uploaded file header: %v", logPrefix, err)
-		c.AbortWithStatusJSON(http.StatusInternalServerError, gin.H{"detail": "Server error: Failed to open uploaded file."})
+	// an empty upload can't contain a chat; reject it before taking a slot
+	if len(chatData) == 0 {
+		log.Printf("%s Uploaded file is empty.", logPrefix)
+		c.AbortWithStatusJSON(http.StatusBadRequest, gin.H{"detail": "Uploaded file is empty."})
 		return
 	}
-	defer uploadedFile.Close()
+
+	// take an analysis slot only now that the upload is fully read, so slow
+	// clients don't hold one while their bytes trickle in. The timed wait is
+	// only set up when no slot is free right away.
+	if !analysisAdmission.TryAcquire() {
+		admitCtx, admitCancel := context.WithTimeout(c.Request.Context(), config.AnalysisQueueTimeout)
+		err = analysisAdmission.Acquire(admitCtx)
+		admitCancel()
+		if err != nil {
+			log.Printf("%s Timed out waiting for an analysis slot: %v", logPrefix, err)
+			c.AbortWithStatusJSON(http.StatusServiceUnavailable, gin.H{"detail": "Server is busy with other analyses, please try again later."})
+			return
+		}
+	}
+	// held until the handler returns, so the slot also covers writing the
+	// final event or body to the client
+	defer analysisAdmission.Release()
 
 	analysisCtx, analysisCancel := context.WithTimeout(c.Request.Context(), config.AnalysisTimeout)
 	defer analysisCancel()
 
-	results, err := AnalyzeChat(analysisCtx, uploadedFile, filename, aiTaskQueue, config.AIQueueTimeout)
-	log.Printf("%s Analysis completed: %s with %d messages", logPrefix, results.ChatName, results.TotalMessages)
+	// clients that accept an event stream get the statistics as soon as they
+	// are ready instead of waiting for the AI analysis as well
+	var onStats func(*AnalysisResult)
+	streamStarted := false
+	if strings.Contains(c.GetHeader("Accept"), "text/event-stream") {
+		onStats = func(partial *AnalysisResult) {
+			c.Header("Cache-Control", "no-cache")
+			c.Header("X-Accel-Buffering", "no")
+			streamStarted = true
+			writeEvent(c, "stats", partial)
+		}
+	}
+
+	results, err := AnalyzeChat(analysisCtx, chatData, filename, aiTaskQueue, config.AIQueueTimeout, onStats)
 
 	if err != nil {
 		if errors.Is(err, ErrAIQueueTimeout) {
@@ -85,7 +258,9 @@ func analyzeHandler(c *gin.Context) {
 	case <-analysisCtx.Done():
 		log.Printf("%s Analysis context ended after AnalyzeChat returned: %v", logPrefix, analysisCtx.Err())
 
-		if errors.Is(analysisCtx.Err(), context.DeadlineExceeded) {
+		if streamStarted {
+			writeEvent(c, "error", gin.H{"detail": "Analysis did not finish before its context ended."})
+		} else if errors.Is(analysisCtx.Err(), context.DeadlineExceeded) {
 			c.AbortWithStatusJSON(http.StatusGatewayTimeout, gin.H{"detail": fmt.Sprintf("Analysis processing timed out after %s.", config.AnalysisTimeout)})
 		} else {
 			c.AbortWithStatusJSON(http.StatusInternalServerError, gin.H{"detail": "Analysis context error after processing."})
@@ -96,15 +271,33 @@ func analyzeHandler(c *gin.Context) {
 
 	if results != nil && results.Error != "" {
 		log.Printf("%s Analysis completed with internal errors: %s", logPrefix, results.Error)
-		c.JSON(http.StatusOK, results)
+		writeResult(c, streamStarted, results)
 		return
 	}
 
 	if results != nil {
-		log.Printf("%s Analysis successful.", logPrefix)
-		c.JSON(http.StatusOK, results)
+		if config.DebugLogging {
+			log.Printf("%s Analysis completed: %s with %d messages", logPrefix, results.ChatName, results.TotalMessages)
+		}
+		writeResult(c, streamStarted, results)
 	} else {
 		log.Printf("%s Analysis returned nil result and nil error unexpectedly.", logPrefix)
 		c.AbortWithStatusJSON(http.StatusInternalServerError, gin.H{"detail": "Analysis failed unexpectedly."})
 	}
 }
+
+// writeEvent sends one server-sent event and flushes it to the client.
+func writeEvent(c *gin.Context, name string, v any) {
+	c.SSEvent(name, v)
+	c.Writer.Flush()
+}
+
+// writeResult sends the final analysis result, as the closing event when the
+// statistics were already streamed and as a plain JSON body otherwise.
+func writeResult(c *gin.Context, streamStarted bool, results *AnalysisResult) {
+	if streamStarted {
+		writeEvent(c, "result", results)
+		return
+	}
+	writeJSON(c, http.StatusOK, results)
+}
@@ -0,0 +1,130 @@
+package main
+
+import (
+	"bytes"
+	"fmt"
+	"io"
+	"mime/multipart"
+	"net/http"
+	"net/http/httptest"
+	"strings"
+	"testing"
+	"time"
+
+	"github.com/gin-gonic/gin"
+)
+
+// useUploadLimit points the handler globals at a test configuration with the
+// given upload limit and restores them when the test ends.
+func useUploadLimit(t *testing.T, limit int64) {
+	savedConfig, savedAdmission, savedQueue := config, analysisAdmission, aiTaskQueue
+	t.Cleanup(func() {
+		config, analysisAdmission, aiTaskQueue = savedConfig, savedAdmission, savedQueue
+	})
+	config = &Config{
+		MaxUploadSizeBytes:   limit,
+		AIQueueTimeout:       time.Second,
+		AnalysisQueueTimeout: time.Second,
+		AnalysisTimeout:      time.Minute,
+	}
+	analysisAdmission = newAdmission(1)
+	aiTaskQueue = make(chan aiTask)
+}
+
+// chatOfSize returns a single-sender export, so no AI analysis is queued,
+// that is exactly size bytes long.
+func chatOfSize(size int) []byte {
+	var chat []byte
+	for n := 0; ; n++ {
+		line := fmt.Sprintf("1/2/23, 9:%02d AM - John: pizza tonight %d\n", n%60, n)
+		if len(chat)+2*len(line) > size {
+			padding := size - len(chat) - len(line)
+			return append(chat, strings.Replace(line, "pizza", "pizza"+strings.Repeat("a", padding), 1)...)
+		}
+		chat = append(chat, line...)
+	}
+}
+
+// uploadRequest builds a multipart analysis request with a form field before
+// the file part. An empty field name leaves the file part out.
+func uploadRequest(field, filename string, file []byte) *http.Request {
+	var body bytes.Buffer
+	w := multipart.NewWriter(&body)
+	w.WriteField("note", "uploaded from a test")
+	if field != "" {
+		part, _ := w.CreateFormFile(field, filename)
+		part.Write(file)
+	}
+	w.Close()
+	r := httptest.NewRequest(http.MethodPost, "/analyze/", &body)
+	r.Header.Set("Content-Type", w.FormDataContentType())
+	return r
+}
+
+func serveAnalyze(r *http.Request) *httptest.ResponseRecorder {
+	gin.SetMode(gin.TestMode)
+	w := httptest.NewRecorder()
+	c, _ := gin.CreateTestContext(w)
+	c.Request = r
+	analyzeHandler(c)
+	return w
+}
+
+func TestAnalyzeHandlerUploadLimit(t *testing.T) {
+	const limit = 8 << 10
+	useUploadLimit(t, limit)
+
+	atLimit := chatOfSize(limit)
+	if len(atLimit) != limit {
+		t.Fatalf("built a %d byte chat, want %d", len(atLimit), limit)
+	}
+	if w := serveAnalyze(uploadRequest("file", "chat.txt", atLimit)); w.Code != http.StatusOK {
+		t.Errorf("file at the limit: got %d %s", w.Code, w.Body)
+	}
+	if w := serveAnalyze(uploadRequest("file", "chat.txt", chatOfSize(limit+1))); w.Code != http.StatusRequestEntityTooLarge {
+		t.Errorf("file over the limit: got %d %s", w.Code, w.Body)
+	}
+
+	// a chunked body has no Content-Length to size the buffer from
+	for _, test := range []struct {
+		size int
+		want int
+	}{{limit, http.StatusOK}, {limit + 1, http.StatusRequestEntityTooLarge}} {
+		r := uploadRequest("file", "chat.txt", chatOfSize(test.size))
+		r.Body = io.NopCloser(struct{ io.Reader }{r.Body})
+		r.ContentLength = -1
+		r.TransferEncoding = []string{"chunked"}
+		if w := serveAnalyze(r); w.Code != test.want {
+			t.Errorf("chunked %d byte file: got %d %s, want %d", test.size, w.Code, w.Body, test.want)
+		}
+	}
+}
+
+func TestAnalyzeHandlerMissingFile(t *testing.T) {
+	useUploadLimit(t, 8<<10)
+	if w := serveAnalyze(uploadRequest("", "", nil)); w.Code != http.StatusBadRequest {
+		t.Errorf("got %d %s", w.Code, w.Body)
+	}
+	if w := serveAnalyze(uploadRequest("attachment", "chat.txt", chatOfSize(100))); w.Code != http.StatusBadRequest {
+		t.Errorf("file under another field name: got %d %s", w.Code, w.Body)
+	}
+}
+
+func TestAnalyzeHandlerDropsLargeBuffers(t *testing.T) {
+	useUploadLimit(t, 2*maxPooledUploadBytes)
+	// the wrong extension is rejected after the upload has been read into a
+	// buffer sized from Content-Length
+	r := uploadRequest("file", "chat.csv", bytes.Repeat([]byte("x"), maxPooledUploadBytes+1))
+	if w := serveAnalyze(r); w.Code != http.StatusBadRequest {
+		t.Fatalf("got %d %s", w.Code, w.Body)
+	}
+	for n := 0; n < 10; n++ {
+		buf := uploadBufferPool.Get().(*[]byte)
+		if cap(*buf) > maxPooledUploadBytes {
+			t.Fatalf("a %d byte buffer was returned to the pool", cap(*buf))
+		}
+		if cap(*buf) == 0 {
+			break // the pool is empty
+		}
+	}
+}
@@ -22,6 +22,7 @@ var (
 	aiTaskQueue        chan aiTask
 	aiWorkerWg         sync.WaitGroup
 	activeAICallsCount int32 // New: counter for active AI calls
+	analysisAdmission  *admission
 )
 
 func main() {
@@ -31,7 +32,9 @@ func main() {
 		log.Fatalf("Failed to load configuration: %v", err)
 	}
 
+	httpClient = newGroqHTTPClient(config.MaxConcurrentAICalls)
 	aiTaskQueue = make(chan aiTask, config.MaxConcurrentAICalls)
+	analysisAdmission = newAdmission(config.MaxConcurrentAnalyses)
 
 	log.Printf("Starting %d AI worker goroutines...", config.MaxConcurrentAICalls)
 	aiWorkerWg.Add(config.MaxConcurrentAICalls)
@@ -51,21 +54,28 @@ func main() {
 	corsConfig := cors.DefaultConfig()
 	corsConfig.AllowOrigins = []string{"http://localhost:3000", "https://bloopit.vercel.app"}
 	corsConfig.AllowCredentials = true
-	corsConfig.AllowMethods = []string{"POST", "GET", "OPTIONS"}
+	corsConfig.AllowMethods = []string{"POST", "GET", "PATCH", "OPTIONS"}
 	corsConfig.AllowHeaders = []string{"Origin", "Content-Length", "Content-Type", "Authorization", "X-API-Key"}
 	router.Use(cors.New(corsConfig))
 
 	router.GET("/health", healthCheckHandler)
 
-	analyzeGroup := router.Group("/")
-	analyzeGroup.Use(limitUploadSizeMiddleware(config.MaxUploadSizeBytes, "/analyze/"))
+	// the size check is scoped to the upload route itself instead of running
+	// on every request and matching the path
+	analyzeHandlers := []gin.HandlerFunc{limitUploadSizeMiddleware(config.MaxUploadSizeBytes)}
 	if config.APIKey != "" {
 		log.Println("API Key protection is ENABLED for /analyze/")
-		analyzeGroup.Use(apiKeyAuthMiddleware(config.APIKey))
+		analyzeHandlers = append(analyzeHandlers, apiKeyAuthMiddleware(config.APIKey))
 	} else {
 		log.Println("Warning: API Key protection is DISABLED for /analyze/ because VAL_API_KEY is not set.")
 	}
-	analyzeGroup.POST("/analyze/", analyzeHandler)
+	analyzeHandlers = append(analyzeHandlers, analyzeHandler)
+	router.POST("/analyze/", analyzeHandlers...)
+
+	// runtime tuning is only exposed when it can be protected by the API key
+	if config.APIKey != "" {
+		router.PATCH("/config/concurrency", apiKeyAuthMiddleware(config.APIKey), updateConcurrencyHandler)
+	}
 
 	cleanupCtx, cleanupCancel := context.WithCancel(context.Background())
 	defer cleanupCancel()
@@ -73,14 +83,21 @@ func main() {
 
 	// start server
 	serverAddr := fmt.Sprintf("%s:%d", config.Host, config.Port)
+	// net/http already serves connections on all cores; what it lacks by
+	// default are limits, so stalled header reads and idle keep-alive
+	// connections don't pin a goroutine and its buffers indefinitely
 	srv := &http.Server{
-		Addr:    serverAddr,
-		Handler: router,
+		Addr:              serverAddr,
+		Handler:           router,
+		ReadHeaderTimeout: 10 * time.Second,
+		IdleTimeout:       120 * time.Second,
 	}
 
 	log.Printf("Server starting...")
+	log.Printf("Max concurrent analyses: %d", config.MaxConcurrentAnalyses)
 	log.Printf("Max concurrent AI calls: %d", config.MaxConcurrentAICalls)
 	log.Printf("AI queue timeout: %s", config.AIQueueTimeout)
+	log.Printf("Analysis queue timeout: %s", config.AnalysisQueueTimeout)
 	log.Printf("Temporary directory: %s", config.TempDirRoot)
 	log.Printf("Max temp file age: %s", config.MaxTempFileAge)
 	log.Printf("Max upload size: %.1f MB", float64(config.MaxUploadSizeBytes)/(1024*1024))
@@ -132,7 +149,7 @@ func aiWorker(id int, tasks <-chan aiTask, wg *sync.WaitGroup) {
 		atomic.AddInt32(&activeAICallsCount, 1) // Increment when task processing starts
 		log.Printf("[AI Worker %d] Processing task for %s. Active calls: %d", id, task.logPrefix, atomic.LoadInt32(&activeAICallsCount))
 
-		aiResult, aiErr := AnalyzeMessagesWithLLM(task.ctx, task.messagesData, task.gapHours)
+		aiResult, aiErr := AnalyzeMessagesWithLLM(task.ctx, task.stratifiedData, task.userCount)
 
 		if errors.Is(aiErr, context.Canceled) {
 			log.Printf("[AI Worker %d] Task cancelled via context for %s", id, task.logPrefix)
@@ -1,6 +1,8 @@
 package main
 
 import (
+	"crypto/subtle"
+	"encoding/json"
 	"fmt"
 	"log"
 	"net/http"
@@ -9,20 +11,22 @@ import (
 )
 
 func apiKeyAuthMiddleware(requiredKey string) gin.HandlerFunc {
+	// the middleware is built at startup, so a missing key stops the server
+	// there instead of turning every protected request into a 503
 	if requiredKey == "" {
-		log.Println("CRITICAL SERVER CONFIG ERROR: apiKeyAuthMiddleware applied, but VAL_API_KEY is not configured!")
-		return func(c *gin.Context) {
-			c.AbortWithStatusJSON(http.StatusServiceUnavailable, gin.H{"detail": "Server configuration error: API Key not set"})
-		}
+		log.Fatal("CRITICAL SERVER CONFIG ERROR: apiKeyAuthMiddleware applied, but VAL_API_KEY is not configured!")
 	}
 
+	// converted once here rather than on every request
+	requiredKeyBytes := []byte(requiredKey)
+
 	return func(c *gin.Context) {
 		providedKey := c.GetHeader("X-API-Key")
 		if providedKey == "" {
 			c.AbortWithStatusJSON(http.StatusUnauthorized, gin.H{"detail": "API key is missing"})
 			return
 		}
-		if providedKey != requiredKey {
+		if subtle.ConstantTimeCompare([]byte(providedKey), requiredKeyBytes) != 1 {
 			c.AbortWithStatusJSON(http.StatusForbidden, gin.H{"detail": "Invalid API key"})
 			return
 		}
@@ -30,21 +34,24 @@ func apiKeyAuthMiddleware(requiredKey string) gin.HandlerFunc {
 	}
 }
 
-func limitUploadSizeMiddleware(maxSizeBytes int64, paths ...string) gin.HandlerFunc {
-	pathMap := make(map[string]bool)
-	for _, p := range paths {
-		pathMap[p] = true
+// limitUploadSizeMiddleware rejects requests whose declared Content-Length is
+// over the limit. It is attached directly to the upload route, so other
+// requests never run it.
+func limitUploadSizeMiddleware(maxSizeBytes int64) gin.HandlerFunc {
+	// the rejection body never changes, so encode it once up front
+	rejectBody, err := json.Marshal(gin.H{
+		"detail": fmt.Sprintf("Maximum request body size limit exceeded (%.1f MB)", float64(maxSizeBytes)/(1024*1024)),
+	})
+	if err != nil {
+		log.Fatalf("Failed to encode upload size rejection body: %v", err)
 	}
 
 	return func(c *gin.Context) {
-		if _, shouldCheck := pathMap[c.Request.URL.Path]; shouldCheck {
-			if c.Request.ContentLength > maxSizeBytes {
-				log.Printf("Rejected upload: Content-Length %d bytes exceeds limit %d bytes.", c.Request.ContentLength, maxSizeBytes)
-				c.AbortWithStatusJSON(http.StatusRequestEntityTooLarge, gin.H{
-					"detail": fmt.Sprintf("Maximum request body size limit exceeded (%.1f MB)", float64(maxSizeBytes)/(1024*1024)),
-				})
-				return
-			}
+		if c.Request.ContentLength > maxSizeBytes {
+			log.Printf("Rejected upload: Content-Length %d bytes exceeds limit %d bytes.", c.Request.ContentLength, maxSizeBytes)
+			c.Data(http.StatusRequestEntityTooLarge, "application/json; charset=utf-8", rejectBody)
+			c.Abort()
+			return
 		}
 		c.Next()
 	}
@@ -0,0 +1,118 @@
+package main
+
+import "strings"
+
+// substringMatcher reports whether a text contains any of a fixed set of
+// patterns. It compiles the patterns into an Aho-Corasick automaton with all
+// failure links resolved ahead of time, so a text is scanned once, one table
+// lookup per byte, however many patterns there are.
+type substringMatcher struct {
+	// classes maps each byte to its column in next. Bytes that appear in no
+	// pattern share class 0, which always leads back to the root.
+	classes    [256]uint16
+	numClasses int
+	next       []int32 // next[state*numClasses+class] is the following state
+	accepting  []bool  // a pattern ends at this state
+}
+
+func newSubstringMatcher(patterns []string) *substringMatcher {
+	patterns = pruneSubsumedPatterns(patterns)
+	m := &substringMatcher{numClasses: 1}
+	for _, p := range patterns {
+		for i := 0; i < len(p); i++ {
+			if m.classes[p[i]] == 0 {
+				m.classes[p[i]] = uint16(m.numClasses)
+				m.numClasses++
+			}
+		}
+	}
+
+	// build the trie, with -1 marking a missing edge
+	m.next = make([]int32, m.numClasses)
+	m.accepting = []bool{false}
+	for i := range m.next {
+		m.next[i] = -1
+	}
+	for _, p := range patterns {
+		state := int32(0)
+		for i := 0; i < len(p); i++ {
+			edge := int(state)*m.numClasses + int(m.classes[p[i]])
+			if m.next[edge] < 0 {
+				m.next[edge] = int32(len(m.accepting))
+				m.accepting = append(m.accepting, false)
+				for c := 0; c < m.numClasses; c++ {
+					m.next = append(m.next, -1)
+				}
+			}
+			state = m.next[edge]
+		}
+		m.accepting[state] = true
+	}
+
+	// resolve failure links breadth first, turning every missing edge into
+	// the transition the automaton would take after falling back
+	fail := make([]int32, len(m.accepting))
+	queue := make([]int32, 0, len(m.accepting))
+	for c := 0; c < m.numClasses; c++ {
+		if child := m.next[c]; child > 0 {
+			queue = append(queue, child)
+		} else {
+			m.next[c] = 0
+		}
+	}
+	for len(queue) > 0 {
+		state := queue[0]
+		queue = queue[1:]
+		if m.accepting[fail[state]] {
+			m.accepting[state] = true
+		}
+		row := int(state) * m.numClasses
+		fallbackRow := int(fail[state]) * m.numClasses
+		for c := 0; c < m.numClasses; c++ {
+			if child := m.next[row+c]; child >= 0 {
+				fail[child] = m.next[fallbackRow+c]
+				queue = append(queue, child)
+			} else {
+				m.next[row+c] = m.next[fallbackRow+c]
+			}
+		}
+	}
+	return m
+}
+
+// pruneSubsumedPatterns drops every pattern that contains another one, since
+// any text it matches is already matched by the shorter pattern. The
+// automaton then has no states below an accepting one and fewer classes, so
+// its table stays small.
+func pruneSubsumedPatterns(patterns []string) []string {
+	kept := make([]string, 0, len(patterns))
+	for i, p := range patterns {
+		subsumed := false
+		for j, q := range patterns {
+			// of two equal patterns, only the first is kept
+			if j != i && strings.Contains(p, q) && (len(q) < len(p) || j < i) {
+				subsumed = true
+				break
+			}
+		}
+		if !subsumed {
+			kept = append(kept, p)
+		}
+	}
+	return kept
+}
+
+// MatchString reports whether s contains any of the patterns.
+func (m *substringMatcher) MatchString(s string) bool {
+	if m.accepting[0] {
+		return true // an empty pattern matches everything
+	}
+	state := int32(0)
+	for i := 0; i < len(s); i++ {
+		state = m.next[int(state)*m.numClasses+int(m.classes[s[i]])]
+		if m.accepting[state] {
+			return true
+		}
+	}
+	return false
+}
@@ -0,0 +1,90 @@
+package main
+
+import (
+	"math/rand"
+	"strings"
+	"testing"
+)
+
+func containsAny(s string, patterns []string) bool {
+	for _, p := range patterns {
+		if strings.Contains(s, p) {
+			return true
+		}
+	}
+	return false
+}
+
+// randomText builds a string from alphabet's bytes, so multi-byte runes are
+// also split into invalid UTF-8, sometimes with one of the patterns spliced
+// in.
+func randomText(r *rand.Rand, alphabet string, patterns []string, maxLen int) string {
+	var b strings.Builder
+	for k := r.Intn(maxLen + 1); k > 0; k-- {
+		if len(patterns) > 0 && r.Intn(maxLen) == 0 {
+			b.WriteString(patterns[r.Intn(len(patterns))])
+		} else {
+			b.WriteByte(alphabet[r.Intn(len(alphabet))])
+		}
+	}
+	return b.String()
+}
+
+func checkSubstringMatcher(t *testing.T, r *rand.Rand, patterns []string, alphabet string, texts int) {
+	t.Helper()
+	m := newSubstringMatcher(patterns)
+	for n := 0; n < texts; n++ {
+		s := randomText(r, alphabet, patterns, 40)
+		if got, want := m.MatchString(s), containsAny(s, patterns); got != want {
+			t.Fatalf("patterns %q, text %q: got %v, strings.Contains gave %v", patterns, s, got, want)
+		}
+	}
+}
+
+func TestSubstringMatcherMatchesContains(t *testing.T) {
+	r := rand.New(rand.NewSource(1))
+	system := append(append([]string(nil), systemMessagePatterns...), attachmentMarkers...)
+	sets := [][]string{
+		system,
+		{"he", "she", "his", "hers"},
+		{"a", "ab", "bab", "bc", "bca", "c", "caa"},
+		{"aaa", "aab", "aa", "aaa"},
+		{"é", "’s", "\u200e<attached:", "e\u0301"},
+		{},
+		{"", "x"},
+	}
+	for _, patterns := range sets {
+		checkSubstringMatcher(t, r, patterns, "abcehrs <>:’é\u200e\u0301", 20000)
+	}
+	checkSubstringMatcher(t, r, system, "abcdeghilmnorstuy <>:\u200e’", 50000)
+
+	// random pattern sets over alphabets small enough for patterns to
+	// overlap and contain one another
+	for n := 0; n < 2000; n++ {
+		alphabet := "abcdé"[:2+r.Intn(4)]
+		patterns := make([]string, r.Intn(6))
+		for i := range patterns {
+			patterns[i] = randomText(r, alphabet, nil, 4)
+		}
+		checkSubstringMatcher(t, r, patterns, alphabet, 50)
+	}
+}
+
+func TestPruneSubsumedPatterns(t *testing.T) {
+	system := append(append([]string(nil), systemMessagePatterns...), attachmentMarkers...)
+	for _, patterns := range [][]string{system, {"ab", "b", "abc", "b", ""}, {"x", "x"}} {
+		kept := pruneSubsumedPatterns(patterns)
+		for _, p := range patterns {
+			if !containsAny(p, kept) {
+				t.Errorf("%q: nothing kept matches %q", patterns, p)
+			}
+		}
+		for i, p := range kept {
+			for j, q := range kept {
+				if i != j && strings.Contains(p, q) {
+					t.Errorf("%q: kept %q, which contains kept %q", patterns, p, q)
+				}
+			}
+		}
+	}
+}
@@ -2,6 +2,8 @@ package main
 
 import (
 	"context"
+	"errors"
+	"io/fs"
 	"log"
 	"os"
 	"path/filepath"
@@ -13,10 +15,23 @@ func runPeriodicTempCleanup(ctx context.Context, dir string, maxAge time.Duratio
 	ticker := time.NewTicker(interval)
 	defer ticker.Stop()
 
+	// when the last sweep left no files behind and the directory's mtime
+	// hasn't moved since, nothing was created in it and the sweep is skipped
+	var idleModTime time.Time
+	idle := false
+
 	for {
 		select {
 		case <-ticker.C:
-			cleanupTempFiles(dir, maxAge)
+			dirInfo, statErr := os.Stat(dir)
+			if idle && statErr == nil && dirInfo.ModTime().Equal(idleModTime) {
+				continue
+			}
+			remaining := cleanupTempFiles(dir, maxAge)
+			idle = statErr == nil && remaining == 0
+			if idle {
+				idleModTime = dirInfo.ModTime()
+			}
 		case <-ctx.Done():
 			log.Println("Stopping periodic temp file cleanup task.")
 			return
@@ -24,47 +39,93 @@ func runPeriodicTempCleanup(ctx context.Context, dir string, maxAge time.Duratio
 	}
 }
 
-func cleanupTempFiles(dir string, maxAge time.Duration) {
+// cleanupTempFiles removes regular files older than maxAge from dir and
+// returns how many regular files are left, or -1 if the directory could not
+// be read.
+func cleanupTempFiles(dir string, maxAge time.Duration) int {
 	log.Printf("Running periodic temp file cleanup in %s...", dir)
 	now := time.Now()
 	count := 0
 	var totalSize int64 = 0
 
-	entries, err := os.ReadDir(dir)
+	// open the directory once as a root: the listing is read through it and
+	// expired files are unlinked relative to its handle, so no full path is
+	// resolved per file and no name can reach outside the directory
+	root, err := os.OpenRoot(dir)
 	if err != nil {
 		if os.IsNotExist(err) {
 			log.Printf("Temp directory %s does not exist, skipping cleanup.", dir)
-			return
+			return -1
 		}
 		log.Printf("Error reading temp directory %s: %v", dir, err)
-		return
+		return -1
+	}
+	defer root.Close()
+
+	// read the directory in one batch through the open handle; unlike
+	// os.ReadDir this skips sorting the entries, which the sweep doesn't need
+	d, err := root.Open(".")
+	if err != nil {
+		log.Printf("Error reading temp directory %s: %v", dir, err)
+		return -1
+	}
+	entries, err := d.ReadDir(-1)
+	d.Close()
+	if err != nil {
+		log.Printf("Error reading temp directory %s: %v", dir, err)
+		return -1
 	}
 
+	// pick the expired files in one pass over the listing, then unlink them
+	// in a single burst afterwards
+	type victim struct {
+		name string
+		size int64
+	}
+	var victims []victim
+	remaining := 0
+
 	for _, entry := range entries {
-		if entry.IsDir() {
+		// the type bits come from the directory read itself, so symlinks,
+		// sockets and other non-regular entries are skipped without an lstat
+		if !entry.Type().IsRegular() {
 			continue
 		}
+		remaining++
 
+		// a file removed since the directory was read is simply gone, not
+		// an error worth logging
 		info, err := entry.Info()
+		if errors.Is(err, fs.ErrNotExist) {
+			remaining--
+			continue
+		}
 		if err != nil {
 			log.Printf("Error getting info for file %s: %v", entry.Name(), err)
 			continue
 		}
+		if now.Sub(info.ModTime()) > maxAge {
+			victims = append(victims, victim{name: entry.Name(), size: info.Size()})
+		}
+	}
 
-		filePath := filepath.Join(dir, entry.Name())
-		fileAge := now.Sub(info.ModTime())
-		fileSize := info.Size()
-
-		if fileAge > maxAge {
-			err := os.Remove(filePath)
-			if err != nil {
-				log.Printf("Error removing temp file %s: %v", filePath, err)
-			} else {
-				log.Printf("Cleaned up old temp file: %s (%.2f KB)", filePath, float64(fileSize)/1024.0)
-				count++
-				totalSize += fileSize
-			}
+	for _, v := range victims {
+		filePath := filepath.Join(dir, v.name)
+		// a single unlink with no existence check first; a file that is
+		// already gone was removed elsewhere and isn't an error
+		err := root.Remove(v.name)
+		if errors.Is(err, fs.ErrNotExist) {
+			remaining--
+			continue
+		}
+		if err != nil {
+			log.Printf("Error removing temp file %s: %v", filePath, err)
+			continue
 		}
+		log.Printf("Cleaned up old temp file: %s (%.2f KB)", filePath, float64(v.size)/1024.0)
+		count++
+		remaining--
+		totalSize += v.size
 	}
 
 	if count > 0 {
@@ -72,4 +133,5 @@ func cleanupTempFiles(dir string, maxAge time.Duration) {
 	} else {
 		log.Println("Periodic cleanup found no old files to remove.")
 	}
+	return remaining
 }
@@ -0,0 +1,289 @@
+package main
+
+import (
+	"strings"
+	"time"
+	"unicode/utf8"
+)
+
+// timestampLayout is one of timestampParseLayouts compiled into the few
+// properties that decide how a date and time parse under it. Parsing then
+// works on the digits directly instead of interpreting the layout string and
+// building a combined datetime string for every message.
+type timestampLayout struct {
+	layout     string
+	compiled   bool // false if the layout isn't in the m/d/y h:mm vocabulary
+	dayFirst   bool // d/m/y rather than m/d/y
+	zeroPadded bool // day and month must have two digits
+
+	// the timestamp's shape, set for every layout whether compiled or not
+	longYear   bool // four-digit year rather than two
+	seconds    bool
+	twelveHour bool // h:mm AM/PM rather than HH:mm
+}
+
+// compileTimestampLayout recognises layouts of the form "<date> <time>" where
+// the date is built from 1/01 (month), 2/02 (day) and 06/2006 (year) and the
+// time is 3:04 or 15:04, optionally with :05 and a trailing PM. Anything else
+// is left uncompiled and parsed with time.Parse.
+func compileTimestampLayout(layout string) timestampLayout {
+	l := timestampLayout{
+		layout:     layout,
+		longYear:   strings.Contains(layout, "2006"),
+		seconds:    strings.Contains(layout, ":05"),
+		twelveHour: strings.Contains(layout, " PM"),
+	}
+	datePart, timePart, ok := strings.Cut(layout, " ")
+	if !ok {
+		return l
+	}
+	switch {
+	case strings.HasPrefix(datePart, "1/2/"):
+	case strings.HasPrefix(datePart, "01/02/"):
+		l.zeroPadded = true
+	case strings.HasPrefix(datePart, "2/1/"):
+		l.dayFirst = true
+	case strings.HasPrefix(datePart, "02/01/"):
+		l.dayFirst, l.zeroPadded = true, true
+	default:
+		return l
+	}
+	switch datePart[strings.LastIndexByte(datePart, '/')+1:] {
+	case "06", "2006":
+	default:
+		return l
+	}
+	switch timePart {
+	case "15:04", "15:04:05", "3:04 PM", "3:04:05 PM":
+	default:
+		return l
+	}
+	l.compiled = true
+	return l
+}
+
+func compileTimestampLayouts(layouts []string) []timestampLayout {
+	compiled := make([]timestampLayout, len(layouts))
+	for i, layout := range layouts {
+		compiled[i] = compileTimestampLayout(layout)
+	}
+	return compiled
+}
+
+// sameFieldOrder reports whether all layouts are compiled and read the day
+// and month in the same order.
+func sameFieldOrder(layouts []timestampLayout) bool {
+	for i := range layouts {
+		if !layouts[i].compiled || layouts[i].dayFirst != layouts[0].dayFirst {
+			return false
+		}
+	}
+	return true
+}
+
+// parse interprets date ("d/m/y" or "m/d/y") and clock ("h:mm[:ss][ AM|PM]",
+// uppercased) under the layout. For trimmed date and clock strings it agrees
+// with time.Parse on the same layout and yields the same UTC time.
+func (l *timestampLayout) parse(date, clock string) (time.Time, bool) {
+	if !l.compiled {
+		t, err := time.Parse(l.layout, date+" "+clock)
+		return t, err == nil
+	}
+	midnight, ok := l.parseDate(date)
+	if !ok {
+		return time.Time{}, false
+	}
+	seconds, ok := l.parseClock(clock)
+	if !ok {
+		return time.Time{}, false
+	}
+	return midnight.Add(time.Duration(seconds) * time.Second), true
+}
+
+// parseDate returns the UTC midnight that starts date. l must be compiled.
+func (l *timestampLayout) parseDate(date string) (time.Time, bool) {
+	firstField, rest, _ := strings.Cut(date, "/")
+	secondField, yearStr, ok := strings.Cut(rest, "/")
+	if !ok {
+		return time.Time{}, false
+	}
+	month, monthOK := parseTimestampNum(firstField, l.zeroPadded)
+	day, dayOK := parseTimestampNum(secondField, l.zeroPadded)
+	if l.dayFirst {
+		month, monthOK, day, dayOK = day, dayOK, month, monthOK
+	}
+	if !monthOK || !dayOK || month < 1 || month > 12 {
+		return time.Time{}, false
+	}
+
+	var year int
+	if l.longYear {
+		if len(yearStr) != 4 {
+			return time.Time{}, false
+		}
+		hi, okHi := parseTimestampNum(yearStr[:2], true)
+		lo, okLo := parseTimestampNum(yearStr[2:], true)
+		if !okHi || !okLo {
+			return time.Time{}, false
+		}
+		year = hi*100 + lo
+	} else {
+		yy, ok := parseTimestampNum(yearStr, true)
+		if !ok {
+			return time.Time{}, false
+		}
+		// the same pivot time.Parse uses for two-digit years
+		if yy >= 69 {
+			year = 1900 + yy
+		} else {
+			year = 2000 + yy
+		}
+	}
+	if day < 1 || day > daysInMonth(year, month) {
+		return time.Time{}, false
+	}
+	return time.Date(year, time.Month(month), day, 0, 0, 0, 0, time.UTC), true
+}
+
+// parseClock returns the seconds since midnight that clock stands for. l
+// must be compiled.
+func (l *timestampLayout) parseClock(clock string) (int, bool) {
+	hourStr, rest, _ := strings.Cut(clock, ":")
+	hour, ok := parseTimestampNum(hourStr, false)
+	if !ok || len(rest) < 2 {
+		return 0, false
+	}
+	minute, ok := parseTimestampNum(rest[:2], true)
+	if !ok || minute > 59 {
+		return 0, false
+	}
+	rest = rest[2:]
+	second := 0
+	if l.seconds {
+		if len(rest) < 3 || rest[0] != ':' {
+			return 0, false
+		}
+		if second, ok = parseTimestampNum(rest[1:3], true); !ok || second > 59 {
+			return 0, false
+		}
+		rest = rest[3:]
+	}
+	if l.twelveHour {
+		if hour > 12 {
+			return 0, false
+		}
+		// like time.Parse, a space in the layout matches a run of spaces
+		if rest == "" || rest[0] != ' ' {
+			return 0, false
+		}
+		switch strings.TrimLeft(rest, " ") {
+		case "AM":
+			if hour == 12 {
+				hour = 0
+			}
+		case "PM":
+			if hour < 12 {
+				hour += 12
+			}
+		default:
+			return 0, false
+		}
+	} else if rest != "" || hour > 23 {
+		return 0, false
+	}
+	return hour*3600 + minute*60 + second, true
+}
+
+// dayCache remembers the last date parsed and the midnight it starts, since
+// consecutive messages mostly share a date. Each goroutine parsing messages
+// keeps its own.
+type dayCache struct {
+	layout   *timestampLayout
+	date     string
+	midnight time.Time
+}
+
+// parse is l.parse, reusing the cached midnight when date and layout are
+// the same as last time.
+func (c *dayCache) parse(l *timestampLayout, date, clock string) (time.Time, bool) {
+	if !l.compiled {
+		return l.parse(date, clock)
+	}
+	if c.layout != l || c.date != date {
+		midnight, ok := l.parseDate(date)
+		if !ok {
+			return time.Time{}, false
+		}
+		c.layout, c.date, c.midnight = l, date, midnight
+	}
+	seconds, ok := l.parseClock(clock)
+	if !ok {
+		return time.Time{}, false
+	}
+	return c.midnight.Add(time.Duration(seconds) * time.Second), true
+}
+
+// cleanClock uppercases clock and turns the narrow no-break space (U+202F)
+// some exports put before AM/PM into a plain space, as
+// strings.ToUpper(strings.ReplaceAll(clock, "\u202f", " ")) would. A clock
+// that needs neither change is returned as is, and one that does is rebuilt
+// in a single allocation.
+func cleanClock(clock string) string {
+	i := 0
+	for i < len(clock) && clock[i] < utf8.RuneSelf && (clock[i] < 'a' || clock[i] > 'z') {
+		i++
+	}
+	if i == len(clock) {
+		return clock
+	}
+
+	cleaned := make([]byte, i, len(clock))
+	copy(cleaned, clock[:i])
+	for i < len(clock) {
+		c := clock[i]
+		switch {
+		case strings.HasPrefix(clock[i:], "\u202f"):
+			cleaned = append(cleaned, ' ')
+			i += len("\u202f")
+			continue
+		case c >= utf8.RuneSelf:
+			// not something matchTimestampLine lets through; take the
+			// general path
+			return strings.ToUpper(strings.ReplaceAll(clock, "\u202f", " "))
+		case 'a' <= c && c <= 'z':
+			c -= 'a' - 'A'
+		}
+		cleaned = append(cleaned, c)
+		i++
+	}
+	return string(cleaned)
+}
+
+// parseTimestampNum parses a one or two digit field; fixed fields must have
+// exactly two digits.
+func parseTimestampNum(s string, fixed bool) (int, bool) {
+	switch {
+	case len(s) == 1 && !fixed && isASCIIDigit(s[0]):
+		return int(s[0] - '0'), true
+	case len(s) == 2 && isASCIIDigit(s[0]) && isASCIIDigit(s[1]):
+		return int(s[0]-'0')*10 + int(s[1]-'0'), true
+	}
+	return 0, false
+}
+
+func isASCIIDigit(b byte) bool {
+	return b >= '0' && b <= '9'
+}
+
+func daysInMonth(year, month int) int {
+	switch month {
+	case 2:
+		if year%4 == 0 && (year%100 != 0 || year%400 == 0) {
+			return 29
+		}
+		return 28
+	case 4, 6, 9, 11:
+		return 30
+	}
+	return 31
+}
@@ -0,0 +1,73 @@
+package main
+
+import (
+	"fmt"
+	"math/rand"
+	"testing"
+	"time"
+)
+
+func checkTimestampParse(t *testing.T, l *timestampLayout, c *dayCache, date, clock string) {
+	t.Helper()
+	want, err := time.Parse(l.layout, date+" "+clock)
+	for _, parse := range []func() (time.Time, bool){
+		func() (time.Time, bool) { return l.parse(date, clock) },
+		func() (time.Time, bool) { return c.parse(l, date, clock) },
+	} {
+		got, ok := parse()
+		if ok != (err == nil) || (ok && (!got.Equal(want) || got.Location() != want.Location())) {
+			t.Fatalf("%q %q %q: got %v %v, time.Parse gave %v %v", l.layout, date, clock, got, ok, want, err)
+		}
+	}
+}
+
+func TestTimestampLayoutParseMatchesTimeParse(t *testing.T) {
+	layouts := compileTimestampLayouts(timestampParseLayouts)
+	for i := range layouts {
+		if !layouts[i].compiled {
+			t.Errorf("layout %q is not compiled", layouts[i].layout)
+		}
+	}
+
+	dates := []string{
+		"29/02/2024", "02/29/2024", "29/02/2023", "02/29/2023", "29/2/00", "2/29/00",
+		"29/2/1900", "2/29/1900", "31/04/21", "4/31/21", "31/12/68", "12/31/68",
+		"1/1/69", "01/01/69", "1/1/2069", "0/1/21", "1/0/21", "13/1/21", "1/13/21",
+		"001/1/21", "1/1/2", "1/1/202", "1/1/20211",
+	}
+	clocks := []string{
+		"12:00 AM", "12:00 PM", "12:59:59 AM", "12:30 PM", "0:00 AM", "00:00 AM",
+		"13:00 PM", "1:00 PM", "11:59 PM", "24:00", "24:00:00", "23:59:59", "00:00",
+		"0:00", "9:60", "9:05:60", "9:5", "009:05", "9:05 XM", "9:05PM", "9:05  PM",
+	}
+	var c dayCache
+	for i := range layouts {
+		for _, date := range dates {
+			for _, clock := range clocks {
+				checkTimestampParse(t, &layouts[i], &c, date, clock)
+			}
+		}
+	}
+
+	r := rand.New(rand.NewSource(1))
+	num := func(max int) string {
+		v := r.Intn(max)
+		switch r.Intn(3) {
+		case 0:
+			return fmt.Sprintf("%02d", v)
+		case 1:
+			return fmt.Sprint(v)
+		}
+		return fmt.Sprintf("%03d", v)
+	}
+	for n := 0; n < 50000; n++ {
+		year := []string{fmt.Sprintf("%02d", r.Intn(100)), fmt.Sprint(1990 + r.Intn(50)), fmt.Sprint(r.Intn(1000))}[r.Intn(3)]
+		date := num(35) + "/" + num(35) + "/" + year
+		clock := num(26) + ":" + fmt.Sprintf("%02d", r.Intn(62))
+		if r.Intn(2) == 0 {
+			clock += fmt.Sprintf(":%02d", r.Intn(62))
+		}
+		clock += []string{"", " AM", " PM"}[r.Intn(3)]
+		checkTimestampParse(t, &layouts[r.Intn(len(layouts))], &c, date, clock)
+	}
+}